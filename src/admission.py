@@ -0,0 +1,141 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Limits how much work each user, channel and guild can give the bot.
+#
+# Every message is charged for the work it's expected to take: the length of
+# its text (after macros are replaced), times the weight of its most costly
+# command's cost class (see `commands.py`). "hello | zalgo" on a 2000 character
+# $LAST costs far more than a few "| caps", where counting messages would treat
+# them the same.
+#
+# Each user, channel and guild has a token bucket, which refills at `rate`
+# tokens a second, up to `capacity`. A message is admitted if all of its
+# buckets can pay for it. If one can't, but would be able to within `max_delay`
+# seconds, it's admitted that long from now (its buckets go into debt, so later
+# messages wait their turn behind it). Otherwise it's rejected, and the user is
+# told once, until one of their messages is admitted again.
+#
+# A bucket that's refilled to capacity is the same as a new one, so buckets
+# are dropped once they've been idle that long, keeping memory bounded by
+# recent activity.
+#
+# Sizes, rates and weights are set in the `[admission]` section of
+# `config.toml`.
+
+from collections import OrderedDict
+from typing import Optional
+import time
+
+# Defaults, per scope. (Tokens are characters times weight.)
+LIMITS = {
+    "user": {"capacity": 40_000, "rate": 2_000},
+    "channel": {"capacity": 100_000, "rate": 5_000},
+    "guild": {"capacity": 200_000, "rate": 10_000},
+}
+WEIGHTS = {"light": 1, "native": 2, "heavy": 10}
+
+
+class Bucket:
+    __slots__ = ("tokens", "updated", "noticed")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.noticed = False  # (Whether the user's been told they're over.)
+
+
+class Scope:
+    """ The buckets of one kind of thing (ie. users), least recently used
+    first. """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.buckets: OrderedDict = OrderedDict()  # ID: Bucket
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+    def get(self, id_, now: float) -> Bucket:
+        """ The thing's bucket, refilled to the current time. """
+        bucket = self.buckets.get(id_)
+        if bucket is None:
+            bucket = self.buckets[id_] = Bucket(self.capacity, now)
+        else:
+            self.buckets.move_to_end(id_)
+            bucket.tokens = min(
+                self.capacity, bucket.tokens + (now - bucket.updated) * self.rate
+            )
+            bucket.updated = now
+        return bucket
+
+    def evict(self, now: float) -> None:
+        """ Drops buckets that have been idle long enough to be full. """
+        idle_time = self.capacity / self.rate
+        while self.buckets:
+            bucket = next(iter(self.buckets.values()))
+            if now - bucket.updated < idle_time - bucket.tokens / self.rate:
+                break
+            self.buckets.popitem(last=False)
+
+
+class Admission:
+    def __init__(self, user=None, channel=None, guild=None, weights=None, max_delay=2.0):
+        limits = {"user": user, "channel": channel, "guild": guild}
+        self.scopes = {
+            name: Scope(**{**LIMITS[name], **(limits[name] or {})}) for name in LIMITS
+        }
+        self.weights = {**WEIGHTS, **(weights or {})}
+        self.max_delay = max_delay
+
+        self.admitted = 0
+        self.delayed = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return sum(len(scope) for scope in self.scopes.values())
+
+    def cost(self, length: int, cost: str) -> float:
+        """ The tokens charged for text of the given length and cost class.
+        (The caller parses the text, so it's only parsed once. See
+        `on_message` in `main.py`.) """
+        return length * self.weights[cost]
+
+    def admit(self, cost: float, user=None, channel=None, guild=None) -> Optional[float]:
+        """ Charges the given things' buckets. Returns how many seconds to
+        wait before running the request, or None if it's rejected. (None IDs,
+        ie. the guild of a DM, aren't charged.) """
+
+        now = time.monotonic()
+        ids = {"user": user, "channel": channel, "guild": guild}
+        buckets = []
+        wait = 0.0
+
+        for name, scope in self.scopes.items():
+            if ids[name] is None:
+                continue
+            scope.evict(now)
+            bucket = scope.get(ids[name], now)
+            buckets.append(bucket)
+            wait = max(wait, (cost - bucket.tokens) / scope.rate)
+
+        if wait > self.max_delay:
+            self.rejected += 1
+            return None
+
+        for bucket in buckets:
+            bucket.tokens -= cost
+            bucket.noticed = False
+        self.admitted += 1
+        if wait > 0:
+            self.delayed += 1
+        return wait
+
+    def notify(self, user) -> bool:
+        """ Whether to tell the user their message was rejected. Only true
+        once until one of their messages is admitted. """
+        bucket = self.scopes["user"].buckets.get(user)
+        if bucket is None or bucket.noticed:
+            return False
+        bucket.noticed = True
+        return True
@@ -0,0 +1,289 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Benchmarks for the lexer/parser/generator and every command callback. Run
+# with `python bench.py`, optionally writing the results to a JSON file to
+# compare against later runs:
+#
+#   python bench.py --output before.json
+#   python bench.py --output after.json --compare before.json
+#
+# Inputs are generated from each command's example, scaled to several sizes.
+# Everything runs offline, with a fixed seed.
+#
+# Import times of the main modules are measured too, each in a fresh
+# interpreter, as workers pay for them every time they're started.
+
+from contextlib import contextmanager
+import argparse
+import asyncio
+import json
+import pathlib
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import timeit
+
+from engine import commands, text_transform
+
+SIZES = [100, 1_000, 10_000]
+
+# Decoders need encoded input, so they're given their example's decoded text,
+# scaled, then encoded by these commands.
+ENCODERS = {"from_hex": "hex", "from_base64": "base64", "from_morse": "morse"}
+
+# Modules timed by `bench_imports`.
+IMPORTS = ["engine.macros", "engine.text_transform", "engine.command_funcs", "executor", "main"]
+
+
+### INPUTS ################################################################
+def scale(text: str, size: int) -> str:
+    """ Repeats text to the given size. """
+    return (text + " ") * (size // (len(text) + 1)) + text[: size % (len(text) + 1)]
+
+
+def example_text(command: dict) -> str:
+    """ The literal text of a command's example, without any pipes or groups. """
+    text = re.sub(r"\|[^{}]*", "", command["example"])
+    return text.replace("{", "").replace("}", "").strip()
+
+
+def callback_input(command: dict, size: int) -> str:
+    alias = command["aliases"][0]
+    if alias in ENCODERS:
+        plain = scale(text_transform.process_text_sync(command["example"]), size)
+        encoder = commands.alias_map[ENCODERS[alias]]
+        if encoder["input"] == "bytes":
+            plain = plain.encode()
+        return commands.get_callback(encoder)(plain, ())
+    return scale(example_text(command), size)
+
+
+def message_input(command: dict, size: int) -> str:
+    """ A message running the command on scaled text. """
+    return f"{callback_input(command, size)} | {command['aliases'][0]}"
+
+
+def stress_inputs() -> dict:
+    return {
+        "nested_braces_50": "{" * 50 + "Hello" + " | caps}" * 50,
+        "nested_braces_300": "{" * 300 + "Hello" + " | caps}" * 300,
+        "nested_braces_10000": "{" * 10_000 + "Hello" + " | caps}" * 10_000,
+        "sibling_groups_500": "{Hello | caps} " * 500,
+        "pipes_100": "Hello, world!" + " | caps | lower" * 50,
+        "pipes_1000": "Hello, world!" + " | caps | lower" * 500,
+        "escapes_5000": "\\|\\{" * 2500,
+    }
+
+
+### TIMING ################################################################
+@contextmanager
+def caches_disabled():
+    """ Keeps the AST and result caches from hiding the cost of the work. """
+    caches = [text_transform.ast_cache, text_transform.result_cache]
+    old_sizes = [cache.max_size for cache in caches]
+    for cache in caches:
+        cache.clear()
+        cache.max_size = 0
+    try:
+        yield
+    finally:
+        for cache, old_size in zip(caches, old_sizes):
+            cache.max_size = old_size
+
+
+def time_call(func, seed: int, min_time=0.01, repeat=3):
+    """ Microseconds per call (best of `repeat`), or the error raised. """
+    random.seed(seed)
+    try:
+        start = time.perf_counter()
+        func()
+        first = time.perf_counter() - start
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+    number = max(1, int(min_time / max(first, 1e-9)))
+
+    random.seed(seed)
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1_000_000
+
+
+def bench_stages(inputs: dict, seed: int) -> dict:
+    """ Times each stage of the engine separately on the given messages. """
+
+    results = {
+        "tokenize": {},
+        "parse": {},
+        "compile": {},
+        "generate": {},
+        "process_text_sync": {},
+    }
+
+    with caches_disabled():
+        for name, text in inputs.items():
+            try:
+                tokens = text_transform.tokenize_sync(text)
+                ast = text_transform.Parser(tokens).parse()
+            except text_transform.PipeBotError as e:
+                for stage in results:
+                    results[stage][name] = f"PipeBotError: {e}"
+                continue
+
+            results["tokenize"][name] = time_call(
+                lambda: text_transform.tokenize_sync(text), seed
+            )
+            results["parse"][name] = time_call(
+                lambda: text_transform.Parser(tokens).parse(), seed
+            )
+            results["compile"][name] = time_call(
+                lambda: text_transform.compile_group(ast), seed
+            )
+            results["generate"][name] = time_call(
+                lambda: text_transform.generate_sync(ast), seed
+            )
+            results["process_text_sync"][name] = time_call(
+                lambda: text_transform.process_text_sync(text), seed
+            )
+
+    return results
+
+
+def bench_callbacks(seed: int) -> dict:
+    results = {}
+
+    for command in commands.text_commands:
+        callback = commands.get_callback(command)
+        timings = {}
+        for size in SIZES:
+            text = callback_input(command, size)
+            if command["input"] == "bytes":
+                text = text.encode()
+            timings[size] = time_call(lambda: callback(text, ()), seed)
+        results[command["aliases"][0]] = timings
+
+    return results
+
+
+def bench_messages(seed: int) -> dict:
+    """ Times whole messages (each command's example), caches included, both
+    through the synchronous engine and the `process_text` coroutine. """
+
+    messages = [tc["example"] for tc in commands.text_commands]
+
+    def run_sync():
+        for message in messages:
+            text_transform.process_text_sync(message)
+
+    async def run_async():
+        for message in messages:
+            await text_transform.process_text(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        results = {
+            "process_text_sync": time_call(run_sync, seed),
+            "process_text": time_call(lambda: loop.run_until_complete(run_async()), seed),
+        }
+    finally:
+        loop.close()
+
+    return {name: us / len(messages) for name, us in results.items()}
+
+
+def bench_imports(repeat=3) -> dict:
+    """ Microseconds to import each module (including what it imports) in a
+    fresh interpreter, as reported by `python -X importtime`. Best of
+    `repeat`, or the error if the module can't be imported. """
+
+    results = {}
+
+    for module in IMPORTS:
+        timings = []
+        for _ in range(repeat):
+            process = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                cwd=pathlib.Path(__file__).parent,
+                capture_output=True,
+                text=True,
+            )
+            if process.returncode != 0:
+                results[module] = process.stderr.strip().splitlines()[-1]
+                break
+
+            # ("import time: self [us] | cumulative | imported package")
+            for line in process.stderr.splitlines():
+                fields = line.split("|")
+                if len(fields) == 3 and fields[2].strip() == module:
+                    timings.append(float(fields[1]))
+        else:
+            results[module] = min(timings)
+
+    return results
+
+
+def run_all(seed: int) -> dict:
+    command_messages = {
+        f"{tc['aliases'][0]}_{size}": message_input(tc, size)
+        for tc in commands.text_commands
+        for size in SIZES
+    }
+
+    return {
+        "meta": {"python": platform.python_version(), "seed": seed, "sizes": SIZES},
+        "imports": bench_imports(),
+        "messages": bench_messages(seed),
+        "stages": bench_stages(command_messages, seed),
+        "stress": bench_stages(stress_inputs(), seed),
+        "callbacks": bench_callbacks(seed),
+    }
+
+
+### REPORTING #############################################################
+def flatten(results: dict, prefix="") -> dict:
+    """ {"a": {"b": 1}} -> {"a.b": 1} """
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def report(results: dict, baseline=None) -> None:
+    flat = flatten({k: v for k, v in results.items() if k != "meta"})
+    flat_baseline = flatten(baseline) if baseline is not None else {}
+    width = max(len(name) for name in flat)
+
+    for name, value in flat.items():
+        if not isinstance(value, float):
+            print(f"{name:{width}}  {value}")
+            continue
+
+        line = f"{name:{width}}  {value:12.1f} µs"
+        old_value = flat_baseline.get(name)
+        if isinstance(old_value, float) and old_value > 0:
+            line += f"  ({value / old_value:5.2f}x)"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for pipe|bot.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to write results to.")
+    parser.add_argument("--compare", help="JSON file of an earlier run.")
+    args = parser.parse_args()
+
+    results = run_all(args.seed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,5 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+# The text engine: the lexer, parser and generator (`text_transform`), the
+# commands (`commands`, `command_funcs`) and the macro patterns (`macros`).
+# None of it depends on Discord, so it can be imported and tested on its own.
@@ -0,0 +1,534 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+from typing import List, Sequence, Tuple
+import random
+import math
+import hashlib
+import re
+import base64
+
+# Data #########################################################################
+morse_map = [
+    ("E̅E̅E̅E̅E̅E̅E̅E̅", "........"),
+    ("I̅N̅T̅", "..-.-"),
+    ("S̅O̅S̅", "...---..."),
+    ("A̅A̅", ".-.-"),
+    ("A̅R̅", ".-.-."),
+    ("A̅S̅", ".-..."),
+    ("B̅K̅", "-...-.-"),
+    ("C̅L̅", "-·-··-··"),
+    ("S̅N̅", "...-."),
+    ("B̅T̅", "-...-"),
+    ("C̅T̅", "-.-.-"),
+    ("D̅O̅", "-··---"),
+    ("K̅N̅", "-·--·"),
+    ("S̅K̅", "···-·-"),
+    ("A", ".-"),
+    ("B", "-..."),
+    ("C", "-.-."),
+    ("D", "-.."),
+    ("E", "."),
+    ("F", "..-."),
+    ("G", "--."),
+    ("H", "...."),
+    ("I", ".."),
+    ("J", ".---"),
+    ("K", "-.-"),
+    ("L", ".-.."),
+    ("M", "--"),
+    ("N", "-."),
+    ("O", "---"),
+    ("P", ".--."),
+    ("Q", "--.-"),
+    ("R", ".-."),
+    ("S", "..."),
+    ("T", "-"),
+    ("U", "..-"),
+    ("V", "...-"),
+    ("W", ".--"),
+    ("X", "-..-"),
+    ("Y", "-.--"),
+    ("Z", "--.."),
+    ("0", "-----"),
+    ("1", ".----"),
+    ("2", "..---"),
+    ("3", "...--"),
+    ("4", "....-"),
+    ("5", "....."),
+    ("6", "-...."),
+    ("7", "--..."),
+    ("8", "---.."),
+    ("9", "----."),
+    (".", ".-.-.-"),
+    (",", "--..--"),
+    ("?", "..--.."),
+    ("'", ".----."),
+    ("!", "-.-.--"),
+    ("/", "-..-."),
+    ("(", "-.--."),
+    (")", "-.--.-"),
+    ("&", ".-..."),
+    (":", "---..."),
+    (";", "-.-.-."),
+    ("=", "-...-"),
+    ("+", ".-.-."),
+    ("-", "-....-"),
+    ("_", "..--.-"),
+    ('"', ".-..-."),
+    ("$", "...-..-"),
+    ("@", ".--.-."),
+    ("¿", "..-.-"),
+    ("¡", "--...-"),
+    (" ", "/"),
+]
+
+# Character substitutions for `char_translate`, as `str.translate` tables.
+# They're built once, here. Characters map to strings, so a character can be
+# substituted by several code points.
+translation_tables = {
+    "light_blackletter": str.maketrans(dict(zip(
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz",
+        "𝔄𝔅ℭ𝔇𝔈𝔉𝔊ℌℑ𝔍𝔎𝔏𝔐𝔑𝔒𝔓𝔔ℜ𝔖𝔗𝔘𝔙𝔚𝔛𝔜ℨ𝔞𝔟𝔠𝔡𝔢𝔣𝔤𝔥𝔦𝔧𝔨𝔩𝔪𝔫𝔬𝔭𝔮𝔯𝔰𝔱𝔲𝔳𝔴𝔵𝔶𝔷",
+    ))),
+    "heavy_blackletter": str.maketrans(dict(zip(
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz",
+        "𝕬𝕭𝕮𝕯𝕰𝕱𝕲𝕳𝕴𝕵𝕶𝕷𝕸𝕹𝕺𝕻𝕼𝕽𝕾𝕿𝖀𝖁𝖂𝖃𝖄𝖅𝖆𝖇𝖈𝖉𝖊𝖋𝖌𝖍𝖎𝖏𝖐𝖑𝖒𝖓𝖔𝖕𝖖𝖗𝖘𝖙𝖚𝖛𝖜𝖝𝖞𝖟",
+    ))),
+    "vapourwave": str.maketrans(dict(zip(
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz",
+        "ＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚ",
+    ))),
+    "double_struck": str.maketrans(dict(zip(
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789",
+        "𝔸𝔹ℂ𝔻𝔼𝔽𝔾ℍ𝕀𝕁𝕂𝕃𝕄ℕ𝕆ℙℚℝ𝕊𝕋𝕌𝕍𝕎𝕏𝕐ℤ𝕒𝕓𝕔𝕕𝕖𝕗𝕘𝕙𝕚𝕛𝕜𝕝𝕞𝕟𝕠𝕡𝕢𝕣𝕤𝕥𝕦𝕧𝕨𝕩𝕪𝕫𝟘𝟙𝟚𝟛𝟜𝟝𝟞𝟟𝟠𝟡",
+    ))),
+    "leet": str.maketrans(dict(zip(
+        "aeoltbgzs",
+        "43017862$",
+    ))),
+    "serif": str.maketrans(dict(zip(
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz",
+        "𝐀𝐁𝐂𝐃𝐄𝐅𝐆𝐇𝐈𝐉𝐊𝐋𝐌𝐍𝐎𝐏𝐐𝐑𝐒𝐓𝐔𝐕𝐖𝐗𝐘𝐙𝐚𝐛𝐜𝐝𝐞𝐟𝐠𝐡𝐢𝐣𝐤𝐥𝐦𝐧𝐨𝐩𝐪𝐫𝐬𝐭𝐮𝐯𝐰𝐱𝐲𝐳",
+    ))),
+    "upside_down": str.maketrans(dict(zip(
+        "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ",
+        "ɐqɔpǝɟƃɥᴉɾʞlɯuodbɹsʇnʌʍxʎz∀qƆpƎℲפHIſʞ˥WNOԀQɹS┴∩ΛMX⅄Z",
+    ))),
+}
+
+# Replacements for `uwu`, made in order. (None of them makes text another
+# one matches, so a `str.replace` pass each, in C, beats a `Rewriter`.)
+uwu_map = {
+    "r": "w", "R": "W", "l": "w", "L": "W", "no": "nyo", "No": "Nyo", "NO": "NYO", "I": "i"
+}
+
+# Uppercase Latin to a choice of Cyrillic look-alikes, for `faux_cyrillic`.
+faux_cyrillic_map = {
+    "BI": ["Ы"],
+    "BL": ["Ы"],
+    "LO": ["Ю"],
+    "IO": ["Ю"],
+    "B": ["Ь","В"],
+    "G": ["Б"],
+    "R": ["Я"],
+    "T": ["Г"],
+    "A": ["Д"],
+    "X": ["Ж", "Х"],
+    "E": ["З", "Э"],
+    "N": ["Й", "И", "Л", "П"],
+    "K": ["К"],
+    "H": ["Н"],
+    "P": ["Р"],
+    "C": ["С"],
+    "Y": ["У", "Ч"],
+    "O": ["Ф", "Φ"],
+    "Q": ["Ф", "Φ"],
+    "U": ["Ц", "Џ"],
+    "W": ["Ш", "Щ"],
+    "F": ["Ғ"],
+}
+
+# Morse code back to Latin. Where two patterns share a code, the first in
+# `morse_map` is used.
+latin_map = {}
+for latin_pattern, morse_pattern in morse_map:
+    latin_map.setdefault(morse_pattern, latin_pattern)
+
+# A table deleting every character with a Morse code of its own, for
+# `morse_length`.
+morse_deletions = str.maketrans("", "", "".join(p for p, _ in morse_map if len(p) == 1))
+
+# Each byte value in binary, for `binary`.
+binary_strings = [format(x, "b") for x in range(256)]
+
+# Chars in "Combining Diacritical Marks" Unicode block, for zalgo.
+combining_chars = [chr(n) for n in range(768, 878)]
+
+### MISC. UTILITY FUNCTIONS ###############################################
+def char_translate(text, table_name):
+    """ Substitutes characters using one of the `translation_tables`. """
+    return text.translate(translation_tables[table_name])
+
+
+class Rewriter:
+    """ Replaces many patterns in a single pass over text. Where several
+    patterns match at a position, the longest is used.
+
+    The patterns are built into a trie, which is compiled into a regex (ie.
+    "a", "ab" and "b" into "(?:a(?:b)?|b)"), so the matching itself is done
+    by the regex engine, without backtracking over every pattern at every
+    position. Build these once per table, not per call. """
+
+    def __init__(self, table: dict):
+        self.table = table
+
+        trie: dict = {}
+        for pattern in table:
+            node = trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node[""] = {}  # (End of a pattern.)
+
+        self.pattern = re.compile(self._trie_pattern(trie))
+
+    @classmethod
+    def _trie_pattern(cls, node: dict) -> str:
+        branches = [re.escape(char) + cls._trie_pattern(child)
+            for char, child in node.items() if char != ""]
+
+        if branches == []:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if "" in node:
+            # (The pattern could end here. The rest is optional, but tried
+            # first, so that the longest pattern wins.)
+            pattern = f"(?:{pattern})?"
+        return pattern
+
+    def sub(self, text: str, choose=None) -> str:
+        """ Replaces every match with its value in the table. With `choose`,
+        values are collections, and `choose` picks from them per match. """
+        if choose is None:
+            return self.pattern.sub(lambda m: self.table[m[0]], text)
+        return self.pattern.sub(lambda m: choose(self.table[m[0]]), text)
+
+    def findall(self, text: str) -> List[str]:
+        """ The values of every match, in order. Text between matches is
+        skipped. """
+        return [self.table[match] for match in self.pattern.findall(text)]
+
+
+def get_hash(hash_type, data: bytes):
+    h = hashlib.new(hash_type)
+    h.update(data)
+    return h.hexdigest()
+
+
+def get_seperator(args: Sequence[str]) -> str:
+    if not args or args[0].lower() == "space":
+        seperator = " "
+    elif args[0].lower() == "none":
+        seperator = ""
+    else:
+        seperator = args[0]
+    return seperator
+
+
+# Rewriters for the above tables. See `Rewriter`.
+faux_cyrillic_rewriter = Rewriter(faux_cyrillic_map)
+morse_rewriter = Rewriter(dict(morse_map))
+
+
+### RANDOMNESS ############################################################
+# Random commands draw from `current_random`, which is the `random` module
+# itself, unless a request has been given a seed (see `seeded_random`). The
+# random decisions for a text are drawn all at once, rather than with a call
+# per character.
+current_random: ContextVar = ContextVar("current_random", default=random)
+
+
+@contextmanager
+def seeded_random(seed):
+    """ Makes random commands reproducible for as long as the context lasts.
+    Only affects the current thread (or task). """
+    token = current_random.set(random.Random(seed))
+    try:
+        yield
+    finally:
+        current_random.reset(token)
+
+
+def random_ints(n: int) -> Sequence[int]:
+    """ `n` random 32-bit unsigned integers, drawn with a single call. """
+    if n == 0:
+        return ()
+    data = current_random.get().getrandbits(32 * n).to_bytes(4 * n, "little")
+    return memoryview(data).cast("I")
+
+
+### CALLBACKS #############################################################
+# Every command callback should:
+#   - Be synchronous (they do no I/O, and are run directly by the generator)
+#   - Accept two arguments:
+#     - Text to transform
+#     - Tuple of argument strings (even if it doesn't use them)
+#   - Return transformed text
+
+def uppercase(text, args):
+    return text.upper()
+
+
+def lowercase(text, args):
+    return text.lower()
+
+
+def swapcase(text, args):
+    return text.swapcase()
+
+
+def light_blackletter(text, args):
+    return char_translate(text, "light_blackletter")
+
+
+def heavy_blackletter(text, args):
+    return char_translate(text, "heavy_blackletter")
+
+
+def vapourwave(text, args):
+    return char_translate(text, "vapourwave")
+
+
+def double_struck(text, args):
+    return char_translate(text, "double_struck")
+
+
+def leet(text, args):
+    new_text = char_translate(text.lower(), "leet")
+
+    return new_text.upper()
+
+
+def redact(text, args):
+    if args:
+        redact_char = args[0]
+    else:
+        redact_char = "█"
+
+    return "".join(
+        redact_char if char.isalnum() or char == "'" else char for char in text
+    )
+
+
+def serif(text, args):
+    return char_translate(text, "serif")
+
+
+def upside_down(text, args):
+    return char_translate(text, "upside_down")
+
+
+def clap(text, args):
+    """ Puts clap emojis between words. """
+
+    if args:
+        clap_str = args[0]
+    else:
+        clap_str = "👏"
+
+    words = text.split(" ")
+    clappy_text = f" {clap_str} ".join(words)
+
+    return clappy_text
+
+
+def clap_length(text, args):
+    """ The length of `clap`'s result. """
+    return len(text) + text.count(" ") * (len(args[0] if args else "👏") + 1)
+
+
+def mock(text, args):
+    """ Alternates between upper and lower case randomly. Sequences of 3+ do
+    not occur. """
+
+    # (A list of single characters, as changing case can change the number
+    # of characters, ie. "ß".upper() == "SS".)
+    new_chars: List[str] = []
+
+    for char, random_int in zip(text, random_ints(len(text))):
+        new_chars.extend(char.upper() if random_int & 1 else char.lower())
+        last_chars = "".join([c for c in new_chars[-3:] if c.isalpha()])
+        if last_chars.isupper() or last_chars.islower():
+            new_chars[-1:] = new_chars[-1].swapcase()
+
+    return "".join(new_chars)
+
+
+def anagram(text, args):
+    """ Shuffles the characters of each word, by sorting them on random
+    keys. """
+    words = text.split()
+    keys = random_ints(sum(len(word) for word in words))
+
+    new_text: List[str] = []
+    start = 0
+    for word in words:
+        shuffled = sorted(zip(keys[start : start + len(word)], word))
+        new_text.append("".join(char for _, char in shuffled) + " ")
+        start += len(word)
+
+    return "".join(new_text)
+
+
+def zalgo(text, args):
+    if len(text) != 0:
+        frequency = 150 / len(text)
+    else:
+        frequency = 0
+
+    # (Which characters get diacritics, and how many. Whitespace gets none.)
+    marks: List[Tuple[int, int]] = []
+    sum_of_frequencies = 0
+
+    for index, char in enumerate(text):
+        count = 0
+        if frequency >= 1:
+            count = math.floor(frequency)
+        else:
+            sum_of_frequencies += frequency
+
+        if sum_of_frequencies >= 1:
+            count += math.floor(sum_of_frequencies)
+            sum_of_frequencies = 0
+
+        if count and not char.isspace():
+            marks.append((index, count))
+
+    diacritics = iter(
+        current_random.get().choices(combining_chars, k=sum(count for _, count in marks))
+    )
+
+    new_text: List[str] = []
+    start = 0
+    for index, count in marks:
+        new_text.append(text[start : index + 1])
+        new_text.extend(islice(diacritics, count))
+        start = index + 1
+    new_text.append(text[start:])
+
+    return "".join(new_text)
+
+
+##### Cyber
+# These take bytes and give text, or the other way around. See `input` in
+# `commands.py`.
+
+def md5(data, args):
+    return get_hash("md5", data)
+
+
+def sha256(data, args):
+    return get_hash("sha256", data)
+
+
+def hexidecimal(data, args):
+    seperator = get_seperator(args)
+
+    # (`bytes.hex` only takes a single ASCII character.)
+    if len(seperator) <= 1 and seperator.isascii():
+        return data.hex(seperator) if seperator else data.hex()
+
+    hexstr = data.hex()
+    return seperator.join([hexstr[i:i+2] for i in range(0, len(hexstr), 2)])
+
+
+def from_hexidecimal(text, args):
+    """ Gives bytes. """
+    return bytes.fromhex(re.sub("[^0-9a-f]", "", text.lower()))
+
+
+def binary(data, args):
+    seperator = get_seperator(args)
+
+    return seperator.join([binary_strings[x] for x in data])
+
+
+def to_base64(data, args):
+    return base64.standard_b64encode(data).decode()
+
+
+def from_base64(text, args):
+    """ Gives bytes. """
+    return base64.b64decode(text)
+
+
+##### Discord markdown
+
+def bold(text, args):
+    return f"**{text}**"
+
+
+def italic(text, args):
+    return f"*{text}*"
+
+
+def underline(text, args):
+    return f"__{text}__"
+
+
+def spoiler(text, args):
+    return f"||{text}||"
+
+
+def code(text, args):
+    return f"`{text}`"
+
+
+def codeblock(text, args):
+    if args:
+        language = args[0]
+    else:
+        language = str()
+
+    return f"```{language}\n{text}\n```"
+
+
+def blockquote(text, args):
+    return f"\n> {text}\n"
+
+
+##### Misc
+def uwu(text, args):
+    """ Warning: cursed. """
+    for pattern, replacement in uwu_map.items():
+        text = text.replace(pattern, replacement)
+    return text
+
+
+def faux_cyrillic(text, args):
+    text = text.upper()
+    random_ints_ = iter(random_ints(len(text)))  # (At most a match per char.)
+    return faux_cyrillic_rewriter.sub(
+        text, choose=lambda options: options[next(random_ints_) % len(options)]
+    )
+
+
+def to_morse(text, args):
+    return "".join(
+        morse_pattern + " " for morse_pattern in morse_rewriter.findall(text.upper())
+    )
+
+
+def morse_length(text, args):
+    """ A lower bound on the length of `to_morse`'s result. Each character
+    with a code gives at least a code and a space, unless it's overlined, in
+    which case it may be part of a prosign. """
+    text = text.upper()
+    coded = len(text) - len(text.translate(morse_deletions))
+    return 2 * max(coded - text.count("\u0305"), 0)
+
+
+def from_morse(text, args):
+    return "".join(latin_map.get(section, "[?]") for section in text.split())
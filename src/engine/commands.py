@@ -0,0 +1,476 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+from typing import Callable, List, Optional, Tuple
+import importlib
+
+### TEXT COMMANDS #########################################################
+# Due to their inherent structure, commands can't be easily organized in any
+# given way. The existence of multiple aliases per command makes things messy.
+# As such, they are stored in this flat dictionary for ease of creation, and
+# a number of convenient mappings are provided at the end of this file.
+
+# aliases: A list of aliases to used to call the function. The first alias is
+#     the primary one, and will be automatically used in all documentation.
+# callback: The name of the callback function in `command_funcs.py`. See
+#     `get_callback`.
+# input: What the callback takes, "text" (a str) or "bytes". Text is encoded
+#     to UTF-8 for callbacks that take bytes. Callbacks can give either, and
+#     bytes are only decoded back to text when it's needed, so chains such
+#     as "| from_hex | sha256" never decode. See `text_transform.py`.
+# category: self-explanatory.
+# per_char: Whether the callback transforms each character on its own, so
+#     that transforming text gives the same as transforming each of its
+#     characters and joining them. Runs of these commands are fused into a
+#     single pass. See `text_transform.py`.
+# deterministic: Whether the callback always gives the same result for the
+#     same text and arguments (ie. it isn't random). Results of these
+#     commands are cached.
+# size_estimate: A lower bound on the length of the result (once stripped),
+#     from a lower bound on the length of the text and the arguments. Used to
+#     stop chains that would blow up before running them, so it must never be
+#     more than the real length, or requests that would fit are turned away.
+# size_check (optional): The name of a function in `command_funcs.py` giving
+#     a lower bound on the length of the result from the text itself. Run
+#     before the callback, so that commands that can blow up are stopped
+#     before they make their result. See `get_size_check`.
+# cost: How the callback spends its time, which decides where long text is
+#     run (see `executor.py`). One of:
+#     - "light": Fast, C-level string methods. Always run inline.
+#     - "native": C code that releases the GIL (ie. hashlib). Run in threads.
+#     - "heavy": Python loops. Run in other processes.
+# description: A short description. Describes the processed text, not the
+#    action taken, ie. "Scrambled characters", not "Scrambles characters".
+# example: A full example of the command on some text. Can include args.
+
+text_commands = [
+    {
+        "aliases": ["caps", "uppercase", "upper"],
+        "callback": "uppercase",
+        "input": "text",
+        "category": "basic",
+        "per_char": True,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "cost": "light",
+        "description": "Uppercase",
+        "example": "Hello, world! | upper"
+    },
+    {
+        "aliases": ["lowercase", "lower"],
+        "callback": "lowercase",
+        "input": "text",
+        "category": "basic",
+        "per_char": True,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "cost": "light",
+        "description": "Lowercase",
+        "example": "Hello, WORLD! | lower"
+    },
+    {
+        "aliases": ["swapcase", "swap case", "swap"],
+        "callback": "swapcase",
+        "input": "text",
+        "category": "basic",
+        "per_char": True,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "cost": "light",
+        "description": "Swapped case per letter",
+        "example": "Hello, WORLD! | swapcase"
+    },
+    {
+        "aliases": ["clap", "clapback"],
+        "callback": "clap",
+        "input": "text",
+        "category": "misc",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "size_check": "clap_length",
+        "cost": "light",
+        "description": "Emojis between words (default 👏)",
+        "example": "You are valid and so is this communication style | clap"
+    },
+    {
+        "aliases": ["mock", "spongebob"],
+        "callback": "mock",
+        "input": "text",
+        "category": "misc",
+        "per_char": False,
+        "deterministic": False,
+        "size_estimate": lambda n, args: n,
+        "cost": "heavy",
+        "description": "Random upper/lowercase",
+        "example": "This is a good thing. | mock"
+    },
+    {
+        "aliases": ["zalgo", "spooky"],
+        "callback": "zalgo",
+        "input": "text",
+        "category": "misc",
+        "per_char": False,
+        "deterministic": False,
+        "size_estimate": lambda n, args: n,
+        "cost": "heavy",
+        "description": "Spooky zalgo text",
+        "example": "He comes | zalgo"
+    },
+    {
+        "aliases": ["scramble"],
+        "callback": "anagram",
+        "input": "text",
+        "category": "misc",
+        "per_char": False,
+        "deterministic": False,
+        "size_estimate": lambda n, args: 0,
+        "cost": "heavy",
+        "description": "Scrambled characters",
+        "example": "Uhhhh this is fine"
+    },
+    {
+        "aliases": ["redact", "censor", "expunge"],
+        "callback": "redact",
+        "input": "text",
+        "category": "substitution",
+        "per_char": True,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n if not args or args[0].strip() else 0,
+        "cost": "heavy",
+        "description": "Letters substituted for character (default █).",
+        "example": "It's essential that you know {this important thing|redact}!"
+    },
+    {
+        "aliases": ["vaporwave", "vapour", "vapor", "vapourwave", "fullwidth", "full"],
+        "callback": "vapourwave",
+        "input": "text",
+        "category": "substitution",
+        "per_char": True,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "cost": "light",
+        "description": "CJK full width letters",
+        "example": "nice AESTHETICC | vapourwave"
+    },
+    {
+        "aliases": ["doublestruck", "double_struck", "blackboard"],
+        "callback": "double_struck",
+        "input": "text",
+        "category": "substitution",
+        "per_char": True,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "cost": "light",
+        "description": "Double-struck math letters",
+        "example": "Hello, World! 1, 2, 3! | blackboard"
+    },
+    {
+        "aliases": ["leet", "haxxor", "hacker", "1337"],
+        "callback": "leet",
+        "input": "text",
+        "category": "substitution",
+        "per_char": True,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "cost": "light",
+        "description": "Elite hacker text",
+        "example": "Mess with the best, die like the rest. | leet"
+    },
+    {
+        "aliases": ["blackletter", "gothic", "fraktur", "old"],
+        "callback": "light_blackletter",
+        "input": "text",
+        "category": "substitution",
+        "per_char": True,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "cost": "light",
+        "description": "Old timey blackletter",
+        "example": "This is soooo legible | blackletter"
+    },
+    {
+        "aliases": ["serif", "cowboy", "western"],
+        "callback": "serif",
+        "input": "text",
+        "category": "substitution",
+        "per_char": True,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "cost": "light",
+        "description": "Unicode serif font",
+        "example": "Howdy there, pardner. | serif"
+    },
+    {
+        "aliases": ["upside-down", "upsidedown", "upside_down", "australia", "flip", "flipped"],
+        "callback": "upside_down",
+        "input": "text",
+        "category": "substitution",
+        "per_char": True,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "cost": "light",
+        "description": "Unicode upside-down font",
+        "example": "I love living in Australia | upside-down"
+    },
+    {
+        "aliases": ["md5", "hash"],
+        "callback": "md5",
+        "input": "bytes",
+        "category": "cyber",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: 32,
+        "cost": "native",
+        "description": "MD5 hash",
+        "example": "hunter2 | md5"
+    },
+    {
+        "aliases": ["sha256"],
+        "callback": "sha256",
+        "input": "bytes",
+        "category": "cyber",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: 64,
+        "cost": "native",
+        "description": "SHA256 hash",
+        "example": "hunter2 | sha256"
+    },
+    {
+        "aliases": ["hex", "hexidecimal"],
+        "callback": "hexidecimal",
+        "input": "bytes",
+        "category": "cyber",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: 2 * n + max(n - 1, 0) * len(command_funcs().get_seperator(args)),
+        "cost": "light",
+        "description": "Hexidecimal representation",
+        "example": "Hello world | hex"
+    },
+    {
+        "aliases": ["from_hex", "from_hexidecimal", "fhex"],
+        "callback": "from_hexidecimal",
+        "input": "text",
+        "category": "cyber",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: 0,
+        "cost": "heavy",
+        "description": "Text from hexidecimal",
+        "example": "48 65 6c 6c 6f 2c 20 77 6f 72 6c 64 21 | from_hex"
+    },
+    {
+        "aliases": ["binary", "bin"],
+        "callback": "binary",
+        "input": "bytes",
+        "category": "cyber",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n + max(n - 1, 0) * len(command_funcs().get_seperator(args)),
+        "cost": "heavy",
+        "description": "Binary representation",
+        "example": "Hello world | bin"
+    },
+    {
+        "aliases": ["base64","b64","base_64"],
+        "callback": "to_base64",
+        "input": "bytes",
+        "category": "cyber",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: (n + 2) // 3 * 4,
+        "cost": "light",
+        "description": "Base64 encoded",
+        "example": "Hello world | base64"
+    },
+    {
+        "aliases": ["from_base64","from_b64", "fb64"],
+        "callback": "from_base64",
+        "input": "text",
+        "category": "cyber",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: 0,
+        "cost": "light",
+        "description": "Text from base 64",
+        "example": "SGVsbG8sIHdvcmxkIQ== | from_base64"
+    },
+    {
+        "aliases": ["bold", "embolden"],
+        "callback": "bold",
+        "input": "text",
+        "category": "markdown",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n + 4,
+        "cost": "light",
+        "description": "Bold",
+        "example": "This is {bold|bold}"
+    },
+    {
+        "aliases": ["italic", "italics", "italicize", "italicise"],
+        "callback": "italic",
+        "input": "text",
+        "category": "markdown",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n + 2,
+        "cost": "light",
+        "description": "Italics",
+        "example": "Wow, look at me | italics"
+    },
+    {
+        "aliases": ["underline"],
+        "callback": "underline",
+        "input": "text",
+        "category": "markdown",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n + 4,
+        "cost": "light",
+        "description": "Underline",
+        "example": "This has a line underneath it | underline"
+    },
+    {
+        "aliases": ["spoiler", "spoil", "spoilers", "spoilerz"],
+        "callback": "spoiler",
+        "input": "text",
+        "category": "markdown",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n + 4,
+        "cost": "light",
+        "description": "Spoiler tag",
+        "example": "Clark Kent is Superman | spoiler"
+    },
+    {
+        "aliases": ["code"],
+        "callback": "code",
+        "input": "text",
+        "category": "markdown",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n + 2,
+        "cost": "light",
+        "description": "Inline code tag",
+        "example": "I64 i = 0 | code"
+    },
+    {
+        "aliases": ["codeblock", "blockcode"],
+        "callback": "codeblock",
+        "input": "text",
+        "category": "markdown",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n + 8 + (len(args[0]) if args else 0),
+        "cost": "light",
+        "description": "Code block",
+        "example": "I64 i = 0; | codeblock",
+    },
+    {
+        "aliases": ["blockquote", "quote", "quotation"],
+        "callback": "blockquote",
+        "input": "text",
+        "category": "markdown",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n + 1,
+        "cost": "light",
+        "description": "Block quote",
+        "example": "Hello | blockquote"
+    },
+    {
+        "aliases": ["uwu", "owo"],
+        "callback": "uwu",
+        "input": "text",
+        "category": "misc",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: n,
+        "cost": "heavy",
+        "description": "Cursed UwU text",
+        "example": "Hello world | uwu"
+    },
+    {
+        "aliases": ["faux_cyrillic", "fake_cyrillic", "faux_russian", "fake_russian", "soviet"],
+        "callback": "faux_cyrillic",
+        "input": "text",
+        "category": "substitution",
+        "per_char": False,
+        "deterministic": False,
+        "size_estimate": lambda n, args: n // 2,
+        "cost": "heavy",
+        "description": "Fake Cyrillic transliteration",
+        "example": "This is valid Russian, right guys? | faux_cyrillic"
+    },
+    {
+        "aliases": ["morse", "telegram", "telegraph"],
+        "callback": "to_morse",
+        "input": "text",
+        "category": "substitution",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: 0,
+        "size_check": "morse_length",
+        "cost": "heavy",
+        "description": "To Morse code.",
+        "example": "Hellp, world | morse"
+    },
+    {
+        "aliases": ["from_morse", "from_telegram", "from_telegraph"],
+        "callback": "from_morse",
+        "input": "text",
+        "category": "substitution",
+        "per_char": False,
+        "deterministic": True,
+        "size_estimate": lambda n, args: 0,
+        "cost": "heavy",
+        "description": "From Morse code.",
+        "example": "... . . | from_morse"
+    },
+]
+
+### USEFUL COMMAND GROUPINGS ##############################################
+# Map of aliases to their respective command dicts.
+alias_map = {alias: tc for tc in text_commands for alias in tc['aliases']}
+
+# Unique categories in alphabetical order.
+categories: List[str] = sorted(set([command["category"] for command in text_commands]))
+
+# Aliases.
+all_aliases: List[str] = [alias for tc in text_commands for alias in tc['aliases']]
+primary_aliases: List[str] = [tc["aliases"][0] for tc in text_commands]
+
+# Primary aliases, in alphabetical order, per category.
+primary_aliases_per_category = {}
+for c in categories:
+
+    cat_aliases = []
+    for a in primary_aliases:
+        if alias_map[a]["category"] == c:
+            cat_aliases.append(a)
+
+    primary_aliases_per_category[c] = sorted(cat_aliases, key=str.lower)
+
+def command_funcs():
+    """ The `command_funcs` module. It's only imported the first time it's
+    needed, which keeps importing this module (and the parser) quick. """
+    return importlib.import_module(".command_funcs", __package__)
+
+
+def get_callback(command: dict) -> Callable[[str, Tuple[str, ...]], str]:
+    return getattr(command_funcs(), command["callback"])
+
+
+def get_size_check(command: dict) -> Optional[Callable[[str, Tuple[str, ...]], int]]:
+    name = command.get("size_check")
+    return None if name is None else getattr(command_funcs(), name)
+
+
+# Cost classes (see `cost` at the start of this file), cheapest first.
+cost_classes: List[str] = ["light", "native", "heavy"]
+
+# Useful regex patterns (not compiled).
+aliases_pattern = fr"\b({'|'.join(all_aliases)})\b"  # Matches "zalgo", "caps", etc.
+aliases_pattern_with_pipe = fr"\|\s*{aliases_pattern}"  # Matches "|zalgo", "| caps", etc.
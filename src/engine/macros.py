@@ -0,0 +1,61 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Patterns for finding commands and the $LAST and $MESSAGE macros in messages.
+# Macros are resolved by the bot itself (see `main.py`), as they need Discord.
+
+import re
+
+from . import commands
+
+
+### COMPILED REGEXES ######################################################
+# "|zalgo", "| mock"; Not "| randomtext"
+command_pattern = re.compile(commands.aliases_pattern_with_pipe)
+
+# Matches the $LAST macro if it's not preceded directly by a backslash or some
+# text. It also matches the user id, whether it be directly or in an @.
+# See `test.py` for succeeding and failing examples.
+#
+# Group 0: Whole match, whitespace stripped. For text replacement.
+# Group 1: The user ID. May be empty.
+macro_LAST = r"\$LAST(?:\s+<@(?:!)?)?(?:\s*(?P<LAST_id>\d{18})(?:>)?)?"
+macro_LAST_pattern = re.compile(fr"(?<![\\\w])({macro_LAST})", re.IGNORECASE)
+
+# Matches the $MESSAGE macro in much in the same way as $LAST. Looks for
+# message IDs instead of user IDs. If there's a message link and not an ID, it
+# grabs the ID from the end of the link. Unlike $LAST, it won't match if there's
+# no ID / link, as $MESSAGE on its own is semantically meaningless.
+#
+# Group 0: Whole match, whitespace stripped. For text replacement.
+# Group 1: The message ID. Won't match if it doesn't exist.
+macro_MESSAGE = (
+    r"\$MESSAGE\s+(?:https://discord\.com/channels/\d{18}/\d{18}/)?(?P<MESSAGE_id>\d{18})"
+)
+macro_MESSAGE_pattern = re.compile(fr"(?<![\\\w])({macro_MESSAGE})", re.IGNORECASE)
+
+# All three of the above, in one pattern, so a message is only scanned once.
+# The groups "command", "LAST" and "MESSAGE" tell which one matched.
+trigger_pattern = re.compile(
+    fr"(?P<command>{commands.aliases_pattern_with_pipe})"
+    fr"|(?i:(?<![\\\w])(?P<LAST>{macro_LAST}))"
+    fr"|(?i:(?<![\\\w])(?P<MESSAGE>{macro_MESSAGE}))"
+)
+
+gated_messages = 0  # Turned away by `find_triggers` without a regex search.
+passed_messages = 0
+
+
+def find_triggers(text):
+    """ Every pipe+command and macro in the text, found in a single pass.
+
+    Most messages are ordinary chat. Anything without a pipe or a "$" can't
+    contain a command or macro, so it's turned away before any regex is run.
+    Counts are kept in `gated_messages` and `passed_messages`. """
+    global gated_messages, passed_messages
+
+    if "|" not in text and "$" not in text:
+        gated_messages += 1
+        return []
+
+    passed_messages += 1
+    return list(trigger_pattern.finditer(text))
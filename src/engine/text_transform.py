@@ -0,0 +1,888 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+from __future__ import annotations
+
+# ^ Allows classes to contain themselves
+
+from dataclasses import dataclass
+from typing import Callable, List, Tuple, Sequence, Optional, Union
+from collections import OrderedDict
+import functools
+import re
+import sys
+import threading
+import time
+
+from . import commands
+
+
+class PipeBotError(Exception):
+    """ Any Pipebot (lexing, parsing, generation) error will directly raise
+    this with a custom message. """
+
+    pass
+
+
+class BudgetError(PipeBotError):
+    """ Raised when a request runs out of its time budget. """
+
+    pass
+
+
+### TIME BUDGET ###########################################################
+# A request is given a budget of CPU time (`time_budget` in `config.toml`),
+# which the parser and generator check between groups and between commands.
+# Once it's spent, the request is cancelled with a `BudgetError`, so one
+# pathological message can't hold up everyone else's for long. Only the CPU
+# time of the running thread counts, so time spent waiting in a pool doesn't.
+timeouts = 0  # Requests cancelled, for monitoring.
+
+
+### METRICS ###############################################################
+# Hooks set by `metrics.py` when metrics are enabled, and None otherwise, in
+# which case nothing is timed. Each is given a duration in seconds (and
+# `observe_step` the step that took it).
+observe_tokenize = None
+observe_parse = None
+observe_generate = None
+observe_step = None
+
+
+class Budget:
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        if seconds is None:
+            self.deadline = None  # Unlimited
+        else:
+            self.deadline = time.thread_time() + seconds
+
+    def check(self) -> None:
+        if self.deadline is not None and time.thread_time() > self.deadline:
+            raise BudgetError("Took too long to process, and was cancelled.")
+
+
+### TOKENS ################################################################
+# A list of tokens is created with patterns to match on. All command aliases
+# are combined into a big regex to match on.
+_ = [
+    ("TEXT", r"\\(\n|.)"),  # Escaped char.
+    ("PIPE", r"(\|)"),
+    ("COMMA", "(,)"),
+    ("BRACE_OPEN", "({)"),
+    ("BRACE_CLOSED", "(})"),
+    ("NEWLINE", r"(\n)"),
+    ("WHITESPACE", r"(\s+)"),
+    ("COMMAND", commands.aliases_pattern),
+    ("TEXT", r"(\S)"),
+]
+TOKENS = [(t[0], re.compile(t[1], re.IGNORECASE)) for t in _]
+TOKEN_TYPES = {t[0] for t in TOKENS}
+
+# The tokenizer doesn't try each of the above in turn, but uses them combined
+# into a single alternation (in the same order), so that every token is found
+# with one match. Each token pattern has exactly one group holding its value,
+# so a match's token type is looked up by the index of the group that matched.
+#
+# One extra TEXT pattern is slotted in after COMMAND. It takes whole runs of
+# word characters, or of non-word non-special characters, instead of a single
+# character at a time. No alias can start inside either kind of run (there's
+# no word boundary inside the first, and aliases start with a word character),
+# so this gives the same tokens as going character by character.
+_.insert(-1, ("TEXT", r"(\w+|[^\w\s\\|,{}]+)"))
+MASTER_PATTERN = re.compile("|".join(f"(?:{t[1]})" for t in _), re.IGNORECASE)
+MASTER_TYPES = {i + 1: t[0] for i, t in enumerate(_)}
+ESCAPE_GROUP = 1  # (Group index of an escaped char.)
+
+
+### TOKENIZER #############################################################
+@dataclass
+class Token:
+    type_: str
+    value: str
+    line: int = 0
+    column: int = 0
+    char_index: int = 0
+
+
+def brace_token_verify(tokens: List[Token]):
+    """ Raises if the tokens' braces are unbalanced. The parser checks this
+    as it goes, so this is only needed to report unbalanced braces over any
+    other error. """
+    brace_value = 0
+
+    for token in tokens:
+        if token.type_ == "BRACE_OPEN":
+            brace_value += 1
+        elif token.type_ == "BRACE_CLOSED":
+            brace_value -= 1
+
+        if brace_value < 0:
+            raise PipeBotError("Unbalanced curly braces.")
+
+    if brace_value != 0:
+        raise PipeBotError("Unbalanced curly braces.")
+
+
+def tokenize_sync(text) -> List[Token]:
+    """ Tokenizes text.
+
+    A token's position is the position of its first character, except for
+    TEXT, where consecutive pieces (escaped chars, runs of characters) are
+    unified into one token that takes the position of its last piece. """
+
+    tokens: List[Token] = []
+    text_pieces: List[str] = []
+    text_token = Token("TEXT", "")
+
+    line = 1
+    line_start = 1  # Used to calculate column
+
+    for match in MASTER_PATTERN.finditer(text):
+        group = match.lastindex
+        type_ = MASTER_TYPES[group]
+        start, char_index = match.span()
+
+        if type_ == "TEXT":
+            # Unify pieces of text. They're only joined once the run of text
+            # ends, which keeps long plain text linear.
+            if group != ESCAPE_GROUP:
+                start = char_index - 1  # (The position of the run's last char.)
+            column = start - line_start + 1 if start else 1
+
+            text_pieces.append(match.group(group))
+            text_token = Token("TEXT", "", line, column, char_index)
+            continue
+
+        if text_pieces:
+            text_token.value = "".join(text_pieces)
+            tokens.append(text_token)
+            text_pieces = []
+
+        column = start - line_start + 1 if start else 1
+        tokens.append(Token(type_, match.group(group), line, column, char_index))
+        if type_ == "NEWLINE":
+            line += 1
+            line_start = char_index
+
+    if text_pieces:
+        text_token.value = "".join(text_pieces)
+        tokens.append(text_token)
+
+    return tokens
+
+
+### PARSER ################################################################
+# AST nodes are immutable, so that parsed ASTs can be cached and shared
+# between messages. See `toAST_sync`.
+@dataclass(frozen=True)
+class Command:
+    alias: str
+    arguments: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Group:
+    """ An AST node.
+    Text and groups are stored in order. Groups will be processed in the
+    generation stage and combined with the text. The commands will be run in
+    order on the entire unified text.
+    """
+
+    content: Tuple[Union[str, Group], ...]
+    commands: Tuple[Command, ...]
+
+
+# The deepest groups are allowed to be nested. Parsing and generation don't
+# recurse, so this is only to bound the work done on silly input.
+MAX_DEPTH = 10_000
+
+
+class Parser:
+    """ Top-down parser.
+    
+    The class' only shared mutable state is the its index in the tokens list.
+    
+    The only method that should be called externally is `parse`. This method
+    returns an AST. Groups are kept on an explicit stack rather than parsed
+    by recursion, so any nesting up to `max_depth` can be parsed.
+    """
+
+    def __init__(
+        self, tokens: List[Token], budget: Optional[Budget] = None, max_depth=MAX_DEPTH
+    ):
+        self.tokens = tokens
+        self.index = 0  # The only shared mutable state
+        self.budget = budget if budget is not None else Budget()
+        self.max_depth = max_depth
+
+    def peek(self, expected_types, offset=0) -> bool:
+        """ Looks at tokens without consuming them. `expected_types` can be a single
+        token name (string) or a collection of acceptable token names. """
+        if type(expected_types) not in [list, tuple]:
+            expected_types = [expected_types]
+
+        index = self.index + offset
+        if index > len(self.tokens) - 1:  # (out of range.)
+            return False
+
+        type_ = self.tokens[index].type_
+        for expected_type in expected_types:
+            if expected_type == "ANY":
+                return True
+            assert expected_type in TOKEN_TYPES, "expected_type doesn't exist."
+            if type_ == expected_type:
+                return True
+
+        return False
+
+    def consume(self, expected_type: Union[str, List[str]]) -> Token:
+        """ Moves index forward and returns the token, if it matches an
+        expected type. """
+        if self.peek(expected_type):
+            # (Update index before returning, but use original for return.)
+            self.index += 1
+            return self.tokens[self.index - 1]
+        else:
+            t = self.tokens[self.index]
+            raise PipeBotError(
+                f"\n{t.line}, {t.column}: Expected {expected_type}, got {t.type_}"
+            )
+
+    def consume_space(self) -> None:
+        """ Consumes whitespace and newlines until none left. """
+
+        while self.peek(["WHITESPACE", "NEWLINE"]):
+            self.consume(["WHITESPACE", "NEWLINE"])
+
+    def parse_text(
+        self, break_tokens=["BRACE_OPEN", "BRACE_CLOSED", "PIPE"]
+    ) -> str:
+        text = ""
+        while self.peek("ANY") and not self.peek(break_tokens):
+            text += self.consume("ANY").value
+        return text
+
+    def parse_arguments(self) -> List[str]:
+        arguments = []
+
+        while True:
+            self.consume_space()
+            if self.peek("ANY"):
+                arguments.append(
+                    self.parse_text(
+                        break_tokens=["BRACE_OPEN", "BRACE_CLOSED", "PIPE", "COMMA"]
+                    )
+                )
+
+                if self.peek("COMMA"):
+                    self.consume("COMMA")
+                    self.consume_space()
+                elif self.peek(["BRACE_CLOSED", "PIPE"]):
+                    break
+                elif self.peek("ANY"):
+                    raise PipeBotError("Bad argument.")
+            else:
+                break  # (End of tokens.)
+        return arguments
+
+    def parse_commands(self):
+        commands: List[Command] = []
+
+        while True:
+            arguments: List[str] = []
+            self.consume("PIPE")
+            self.consume_space()
+            if not self.peek("ANY"):  # end of tokens
+                raise PipeBotError("Pipe character at the end of tokens.")
+
+            self.consume_space()
+
+            alias = self.consume("COMMAND").value
+
+            self.consume_space()
+            if self.peek(["TEXT", "COMMAND"]):
+                arguments = self.parse_arguments()
+            elif self.peek("COMMA"):
+                raise PipeBotError("Unexpected comma after command.")
+            commands.append(Command(alias, tuple(arguments)))
+
+            self.consume_space()
+            if not self.peek("PIPE"):
+                break
+
+        return commands
+
+    def parse(self) -> Group:
+        if self.tokens == []:
+            return Group(("",), ())
+
+        try:
+            return self.parse_groups()
+        except BudgetError:
+            raise
+        except PipeBotError:
+            brace_token_verify(self.tokens)
+            raise
+
+    def parse_groups(self) -> Group:
+        # (The content and commands of each open group, outermost first.)
+        stack: List[Tuple[List[Union[Group, str]], List[Command]]] = [([], [])]
+
+        self.budget.check()
+        while self.index < len(self.tokens):
+            content, commands = stack[-1]
+            if self.peek("PIPE"):
+                commands[:] = self.parse_commands()
+            elif self.peek("BRACE_OPEN"):
+                self.consume("BRACE_OPEN")
+                if len(stack) > self.max_depth:
+                    raise PipeBotError(
+                        f"Groups nested too deeply. (Max depth is {self.max_depth}.)"
+                    )
+                self.budget.check()
+                stack.append(([], []))
+            elif self.peek("BRACE_CLOSED"):
+                self.consume("BRACE_CLOSED")
+                if len(stack) == 1:
+                    raise PipeBotError("Unbalanced curly braces.")
+                stack.pop()
+                stack[-1][0].append(Group(tuple(content), tuple(commands)))
+            elif self.peek("ANY"):
+                content.append(self.parse_text())
+
+        if len(stack) > 1:
+            raise PipeBotError("Unbalanced curly braces.")
+
+        content, commands = stack[0]
+        return Group(tuple(content), tuple(commands))
+
+
+### CACHES ################################################################
+class LRUCache:
+    """ A thread-safe, least recently used cache.
+
+    Entries are evicted once there are more than `max_entries` of them, or
+    once their summed sizes (as given to `put`) go over `max_size`. Lookups
+    are counted in `hits` and `misses`. """
+
+    def __init__(self, max_entries: int, max_size: int):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()  # key: (value, size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key):
+        """ Returns the cached value, or None. """
+        with self._lock:
+            try:
+                value, _ = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size: int) -> None:
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.size += size
+
+            while len(self._entries) > self.max_entries or self.size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+# Parsed ASTs, keyed by text. Most messages are some literal text followed by
+# a pipeline ("Some text | caps | zalgo"), where the text changes from message
+# to message but the pipeline doesn't. When the literal text can't affect how
+# the pipeline is parsed (it has no braces or backslashes), only the pipeline
+# is parsed and cached, and the literal text is put in front of it afterwards.
+# Entries are the AST and its compiled `Program`.
+ast_cache = LRUCache(max_entries=2048, max_size=2_000_000)
+
+# Matches the first character that can make text more than literal text.
+special_char_pattern = re.compile(r"[\\{}|]")
+
+
+def parse(text, budget: Optional[Budget] = None) -> Group:
+    """ Tokenizes and parses text, without the cache. """
+    start = time.perf_counter()
+    tokens = tokenize_sync(text)
+    if observe_tokenize is not None:
+        end = time.perf_counter()
+        observe_tokenize(end - start)
+        start = end
+
+    if budget is not None:
+        budget.check()
+    group = Parser(tokens, budget).parse()
+    if observe_parse is not None:
+        observe_parse(time.perf_counter() - start)
+    return group
+
+
+def toAST_sync(text, budget: Optional[Budget] = None) -> Group:
+    return toProgram_sync(text, budget)[0]
+
+
+def toProgram_sync(text, budget: Optional[Budget] = None) -> Tuple[Group, Program]:
+    """ Parses and compiles text, using the cache. """
+    match = special_char_pattern.search(text)
+    if match is None:
+        # (Nothing but text.)
+        return Group((text,), ()), Program(((PUSH, text),), 1, ())
+
+    if match.group() == "|":
+        head, key = text[: match.start()], text[match.start() :]
+    else:
+        head, key = "", text
+
+    entry = ast_cache.get(key)
+    if entry is None:
+        try:
+            group = parse(key, budget)
+        except BudgetError:
+            raise
+        except PipeBotError:
+            # (Errors give positions, which need to be relative to the whole
+            # text, not just the pipeline. Errors aren't cached.)
+            group = parse(text, budget)
+            return group, compile_group(group)
+        entry = (group, compile_group(group))
+        ast_cache.put(key, entry, len(key))
+
+    group, program = entry
+    if head:
+        # (The literal text is a string that would've been parsed first.)
+        return (
+            Group((head,) + group.content, group.commands),
+            Program(((PUSH, head),) + program.body, program.parts + 1, program.steps),
+        )
+    return group, program
+
+
+### COMMAND FUSION ########################################################
+# Values passed between commands are text, or bytes from commands that give
+# bytes (see `input` in `commands.py`).
+Value = Union[str, bytes]
+
+
+# Chains such as "| caps | vaporwave" would take a pass over the text per
+# command. Consecutive per-character commands (see `commands.py`) are fused
+# into a single `str.translate` table, which is filled in with the composed
+# result of each character as characters come up.
+
+
+class FusionError(Exception):
+    """ Raised when a fused table can't give the same result as running its
+    commands one after the other. """
+
+    pass
+
+
+@dataclass(frozen=True)
+class Step:
+    """ A command's callback, bound to its arguments. """
+
+    callback: Callable[[Value, Tuple[str, ...]], Value]
+    arguments: Tuple[str, ...]
+    deterministic: bool
+    takes_bytes: bool = False  # (See `input` in `commands.py`.)
+    alias: str = ""  # (The command's first alias, for metrics.)
+    size_check: Optional[Callable[[Value, Tuple[str, ...]], int]] = None
+
+    def run(self, value: Value) -> Value:
+        return self.callback(value, self.arguments)
+
+
+class FusedTable(dict):
+    """ A `str.translate` table for a run of per-character commands. """
+
+    max_entries = 4096
+    takes_bytes = False
+    size_check = None  # (Per-character commands never blow up.)
+
+    def __init__(self, steps: Tuple[Step, ...]):
+        super().__init__()
+        self.steps = steps
+        self.deterministic = all(step.deterministic for step in steps)
+
+    def __missing__(self, ordinal: int) -> str:
+        text = chr(ordinal)
+        for step in self.steps:
+            # (Python lowercases a capital sigma depending on its neighbours,
+            # which a table can't know about.)
+            if "\u03a3" in text:
+                raise FusionError
+            text = step.run(text)
+
+        if len(self) >= self.max_entries:
+            self.clear()
+        self[ordinal] = text
+        return text
+
+    def run(self, text: str) -> str:
+        try:
+            return text.translate(self)
+        except FusionError:
+            for step in self.steps:
+                text = step.run(text)
+                check_length(text)
+            return text
+
+
+@functools.lru_cache(maxsize=1024)
+def fuse_commands(commands_: Tuple[Command, ...]) -> Tuple[Union[Step, FusedTable], ...]:
+    """ Binds commands to their callbacks, fusing runs of per-character
+    commands. """
+
+    steps: List[Union[Step, FusedTable]] = []
+    run: List[Step] = []
+
+    def end_run():
+        if len(run) > 1:
+            steps.append(FusedTable(tuple(run)))
+        else:
+            steps.extend(run)
+        run.clear()
+
+    for command in commands_:
+        command_dict = commands.alias_map[command.alias.lower()]
+        step = Step(
+            commands.get_callback(command_dict),
+            command.arguments,
+            command_dict["deterministic"],
+            command_dict["input"] == "bytes",
+            command_dict["aliases"][0],
+            commands.get_size_check(command_dict),
+        )
+        if command_dict["per_char"]:
+            run.append(step)
+        else:
+            end_run()
+            steps.append(step)
+    end_run()
+
+    return tuple(steps)
+
+
+### COMPILER ##############################################################
+# An AST is compiled into a flat program for a stack machine, so generating
+# text is one loop over a list of instructions, rather than a walk of the
+# tree. Each instruction is an (opcode, operand) pair:
+#
+#   PUSH  text   Pushes literal text.
+#   JOIN  n      Pops n texts, and pushes them joined and stripped.
+#   APPLY step   Replaces the top text with the result of a bound command
+#                (see `fuse_commands`).
+#
+# The root group's join and commands are kept apart from the rest of its
+# program, so that cached programs can have literal text put in front of
+# them. See `toProgram_sync`.
+PUSH, JOIN, APPLY = range(3)
+
+
+@dataclass(frozen=True)
+class Program:
+    body: Tuple[Tuple[int, object], ...]  # Everything up to the root's join.
+    parts: int  # Texts joined by the root. Nothing is generated if it's 0.
+    steps: Tuple[Union[Step, FusedTable], ...]  # The root's commands.
+
+
+def compile_group(group: Group) -> Program:
+    """ Compiles an AST into a `Program`. """
+
+    body: List[Tuple[int, object]] = []
+
+    # (Groups are compiled in post-order with an explicit stack, holding
+    # groups still to be compiled and instructions to be emitted after
+    # them.)
+    stack: List[Union[Group, Tuple[int, object]]] = [
+        c if isinstance(c, Group) else (PUSH, c) for c in reversed(group.content)
+    ]
+    while stack:
+        item = stack.pop()
+        if not isinstance(item, Group):
+            body.append(item)
+        elif item.content == ():
+            body.append((PUSH, ""))
+        elif not any(isinstance(c, Group) for c in item.content):
+            # (Literal text only, so it can be joined here.)
+            body.append((PUSH, str().join(item.content).strip()))
+            body.extend((APPLY, step) for step in fuse_commands(item.commands))
+        else:
+            stack.extend((APPLY, step) for step in reversed(fuse_commands(item.commands)))
+            stack.append((JOIN, len(item.content)))
+            stack.extend(
+                c if isinstance(c, Group) else (PUSH, c) for c in reversed(item.content)
+            )
+
+    return Program(tuple(body), len(group.content), fuse_commands(group.commands))
+
+
+def run_program(program: Program, budget: Optional[Budget] = None) -> str:
+    if program.parts == 0:
+        return str()
+    if budget is None:
+        budget = Budget()
+
+    stack: List[Value] = []
+    push = stack.append
+
+    for opcode, operand in program.body:
+        if opcode == PUSH:
+            push(operand)
+        elif opcode == JOIN:
+            text = str().join(map(as_text, stack[-operand:])).strip()
+            del stack[-operand:]
+            push(text)
+        else:
+            budget.check()
+            stack[-1] = value = run_step(stack[-1], operand)
+            check_length(value)
+
+    value = str().join(map(as_text, stack)).strip()
+    for step in program.steps:
+        budget.check()
+        value = run_step(value, step)
+
+        # (Per-character commands never shorten text, so a fused step's
+        # result is at least as long as anything it would have made before.)
+        check_length(value)
+
+    return as_text(value)
+
+
+### GENERATOR #############################################################
+# The longest text allowed at any point of generation. Prevents exponential
+# string expansion (ie. with clap and/or $LAST). Let it be longer than message
+# limit, as a user might want to chain commands where the final string is
+# shorter, ie. "|morse|morse|md5"
+BUFFER_LENGTH = 10_000
+
+# Results of deterministic commands, keyed by the step and the text it was
+# given. Sizes are the memory taken by the text and the result.
+result_cache = LRUCache(max_entries=4096, max_size=16_000_000)
+
+
+def generate_sync(group: Group, budget: Optional[Budget] = None) -> str:
+    """ Generates text from the AST, by compiling and running it. The AST
+    itself isn't modified, so cached ASTs can be generated any number of
+    times. """
+
+    # The `content` of a Group is a mixed list of strings and Groups. The
+    # Groups are generated first, then everything is combined and run through
+    # the Group's commands.
+    return run_program(compile_group(group), budget)
+
+
+def run_step(value: Value, step: Union[Step, FusedTable]) -> Value:
+    if step.takes_bytes:
+        if isinstance(value, str):
+            value = value.encode()
+    elif isinstance(value, bytes):
+        value = as_text(value)
+
+    # (Static estimates can't see the text, so commands that can blow up
+    # check it here, before their result is made.)
+    if step.size_check is not None and step.size_check(value, step.arguments) > BUFFER_LENGTH:
+        raise PipeBotError("Text result much too long for buffer.")
+
+    if not step.deterministic:
+        return run_timed(step, value)
+
+    key = (step.steps if isinstance(step, FusedTable) else step, value)
+    result = result_cache.get(key)
+    if result is None:
+        result = run_timed(step, value)
+        result_cache.put(key, result, sys.getsizeof(value) + sys.getsizeof(result))
+    return result
+
+
+def run_timed(step: Union[Step, FusedTable], value: Value) -> Value:
+    if observe_step is None:
+        return step.run(value)
+
+    start = time.perf_counter()
+    result = step.run(value)
+    observe_step(step, time.perf_counter() - start)
+    return result
+
+
+def as_text(value: Value) -> str:
+    """ Decodes bytes given by a command, as UTF-8. """
+    if isinstance(value, str):
+        return value
+    try:
+        return value.decode()
+    except UnicodeDecodeError:
+        raise PipeBotError("Result isn't valid UTF-8 text.")
+
+
+def check_length(value: Value) -> None:
+    if len(value) > BUFFER_LENGTH:
+        raise PipeBotError("Text result much too long for buffer.")
+
+
+def estimate_length(group: Group) -> int:
+    """ A lower bound on the length of the text a Group will generate, using
+    each command's `size_estimate`, without running anything. Raises if the
+    text is certain to get too long for the buffer along the way. """
+
+    # (Groups are estimated in the order they'd be generated, with an
+    # explicit stack. `lengths` holds the estimates of groups whose parent
+    # hasn't been estimated yet.)
+    lengths: List[int] = []
+    stack = [(group, False)]
+    while stack:
+        group, children_done = stack.pop()
+        if not children_done:
+            stack.append((group, True))
+            stack.extend(
+                (c, False) for c in reversed(group.content) if isinstance(c, Group)
+            )
+            continue
+
+        if group.content == ():
+            lengths.append(0)
+            continue
+
+        # (Joined text is stripped. Whatever's around them, each piece of
+        # text keeps everything from its first to its last non-space.)
+        length = 0
+        children = 0
+        for c in group.content:
+            if isinstance(c, Group):
+                children += 1
+            else:
+                length += len(c.strip())
+        if children:
+            length += sum(lengths[-children:])
+            del lengths[-children:]
+
+        for command in group.commands:
+            estimate = commands.alias_map[command.alias.lower()]["size_estimate"]
+            length = estimate(length, command.arguments)
+            if length > BUFFER_LENGTH:
+                raise PipeBotError(
+                    f"Text result would be much too long for buffer (at \"{command.alias}\")."
+                )
+        lengths.append(length)
+
+    return lengths[0]
+
+
+def pipeline_cost(group: Group) -> str:
+    """ The most expensive cost class (see `commands.py`) of any command in
+    the AST. """
+
+    cost = 0
+    groups = [group]
+    while groups:
+        group = groups.pop()
+        for command in group.commands:
+            command_cost = commands.alias_map[command.alias.lower()]["cost"]
+            cost = max(cost, commands.cost_classes.index(command_cost))
+        groups.extend(c for c in group.content if isinstance(c, Group))
+
+    return commands.cost_classes[cost]
+
+
+def process_text_sync(
+    text: str,
+    max_length: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    seed=None,
+) -> str:
+    """ Runs text through the whole engine. If `max_length` is given, text
+    certain to be longer than that is rejected before it's generated. If
+    `time_budget` is given, processing is cancelled after that many seconds
+    of CPU time. If `seed` is given, random commands give the same result
+    every time (see `command_funcs.seeded_random`). """
+
+    budget = Budget(time_budget)
+    try:
+        AST, program = toProgram_sync(text, budget)
+
+        estimated_length = estimate_length(AST)
+        if max_length is not None and estimated_length > max_length:
+            raise PipeBotError(
+                f"Result would be too long. {estimated_length}+/{max_length}"
+            )
+
+        start = time.perf_counter()
+        if seed is None:
+            res = run_program(program, budget)
+            if observe_generate is not None:
+                observe_generate(time.perf_counter() - start)
+            return res
+
+        # (Seeded requests always give the same result, so they're cached
+        # whole.)
+        key = ("seeded", text, seed)
+        res = result_cache.get(key)
+        if res is None:
+            with commands.command_funcs().seeded_random(seed):
+                res = run_program(program, budget)
+            result_cache.put(key, res, sys.getsizeof(text) + sys.getsizeof(res))
+            if observe_generate is not None:
+                observe_generate(time.perf_counter() - start)
+        return res
+    except PipeBotError as e:
+        return error_text(e)
+
+
+def error_text(error: PipeBotError) -> str:
+    """ The reply for an error. Requests that ran out of their time budget are
+    counted in `timeouts`. """
+    global timeouts
+
+    if isinstance(error, BudgetError):
+        timeouts += 1
+    return f"`ERROR: {error}`"
+
+
+### ASYNC INTERFACE #######################################################
+# None of the engine does any I/O, so it's all synchronous underneath. These
+# thin wrappers are kept for callers that expect coroutines.
+async def tokenize(text) -> List[Token]:
+    return tokenize_sync(text)
+
+
+async def toAST(text) -> Group:
+    return toAST_sync(text)
+
+
+async def generate(group: Group) -> str:
+    return generate_sync(group)
+
+
+async def process_text(
+    text: str,
+    max_length: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    seed=None,
+) -> str:
+    return process_text_sync(text, max_length, time_budget, seed)
@@ -0,0 +1,140 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Runs text through the engine without holding up the event loop.
+#
+# The engine is pure CPU work, so long text run on the event loop stalls the
+# Discord connection (and everyone else's messages) until it's done. Each
+# command declares a cost class (see `commands.py`), and the most expensive
+# command in a message decides where it's run:
+#
+#   - Short text, or text only going through "light" commands, is run inline.
+#     Handing it off would cost more than running it.
+#   - "native" commands (hashlib) release the GIL, so they're run in a thread
+#     pool.
+#   - "heavy" commands are Python loops, which hold the GIL, so they're run
+#     in a process pool.
+#
+# Pool sizes and the inline threshold are set in the `[executor]` section of
+# `config.toml`. A pool of size 0 is disabled, and its work falls back to the
+# next cheapest option.
+#
+# Every job is given the same CPU time budget (see `text_transform.py`),
+# wherever it's run.
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+import asyncio
+import multiprocessing
+import time
+
+from engine import text_transform
+
+
+def run_job(
+    text: str, max_length: Optional[int], time_budget: Optional[float], seed
+) -> Tuple[float, int, str]:
+    """ Runs text through the engine in a pool, returning when it started
+    (to measure time spent waiting in the queue), whether it timed out (as
+    the count in a worker process isn't seen by this one), and the result. """
+    started = time.time()
+    timeouts = text_transform.timeouts
+    result = text_transform.process_text_sync(text, max_length, time_budget, seed)
+    return started, text_transform.timeouts - timeouts, result
+
+
+class PoolStats:
+    """ Queue depth and wait times for one pool. """
+
+    def __init__(self):
+        self.queued = 0  # Submitted, but not finished.
+        self.max_queued = 0
+        self.jobs = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.jobs if self.jobs else 0.0
+
+
+class Executor:
+    def __init__(
+        self, thread_workers=2, process_workers=1, inline_max_length=1000, time_budget=None
+    ):
+        self.inline_max_length = inline_max_length
+        self.time_budget = time_budget
+        self.inline_jobs = 0
+
+        self.pools = {}
+        self.stats = {}
+        if thread_workers > 0:
+            self.pools["native"] = ThreadPoolExecutor(thread_workers)
+        if process_workers > 0:
+            # (Forking a process with threads, like the client's, can leave
+            # the child deadlocked. Workers only import the engine, so
+            # they're quick to start from the fork server, or to spawn where
+            # there isn't one.)
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+            else:
+                context = multiprocessing.get_context("spawn")
+            self.pools["heavy"] = ProcessPoolExecutor(process_workers, mp_context=context)
+        for cost in self.pools:
+            self.stats[cost] = PoolStats()
+
+    def choose_pool(self, text: str, cost: Optional[str] = None) -> Optional[str]:
+        """ Returns the cost class of the pool to run text in, or None to run
+        it inline. The text's cost class is found from its AST, unless it's
+        given. """
+
+        if len(text) <= self.inline_max_length:
+            return None
+
+        if cost is None:
+            try:
+                cost = text_transform.pipeline_cost(text_transform.toAST_sync(text))
+            except text_transform.PipeBotError:
+                return None  # (Errors are quick, and reported inline.)
+
+        if cost == "heavy" and "heavy" not in self.pools:
+            cost = "native"
+        if cost == "native" and "native" not in self.pools:
+            cost = "light"
+        return None if cost == "light" else cost
+
+    async def process_text(
+        self, text: str, max_length: Optional[int] = None, seed=None, cost=None
+    ) -> str:
+        cost = self.choose_pool(text, cost)
+        if cost is None:
+            self.inline_jobs += 1
+            return text_transform.process_text_sync(
+                text, max_length, self.time_budget, seed
+            )
+
+        stats = self.stats[cost]
+        stats.queued += 1
+        stats.max_queued = max(stats.max_queued, stats.queued)
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            started, timeouts, result = await loop.run_in_executor(
+                self.pools[cost], run_job, text, max_length, self.time_budget, seed
+            )
+        finally:
+            stats.queued -= 1
+
+        if cost == "heavy":
+            text_transform.timeouts += timeouts
+
+        wait = max(0.0, started - submitted)
+        stats.jobs += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        return result
+
+    def shutdown(self) -> None:
+        """ Stops the pools, waiting for their work to finish. Pool processes
+        left running keep their parent from exiting. """
+        for pool in self.pools.values():
+            pool.shutdown()
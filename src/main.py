@@ -1,8 +1,12 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import re
+import json
+import time
+import hashlib
 import pathlib
 import asyncio
+import signal
 import platform
 
 import discord
@@ -11,40 +15,58 @@ import appdirs
 if platform.system() == "OpenBSD":
     import openbsd
 
-import commands
-from text_transform import process_text
+from engine import commands, macros, text_transform
+from engine.text_transform import process_text_sync, toAST_sync, PipeBotError
+from executor import Executor
+from admission import Admission
+from message_cache import MessageCache
+from send_queue import SendQueue
+import metrics
 
 
-async def safely_replace_substr(text, substr, new_substr):
-    """ Replace substr with a safely escaped new_substr. """
+def escape_dangerous_chars(text):
+    """ Escape the characters the parser treats specially. """
     dangerous_chars = r"\{}|,"
 
     for c in dangerous_chars:
-        new_substr = new_substr.replace(c, "\\" + c)
+        text = text.replace(c, "\\" + c)
 
-    return text.replace(substr, new_substr, 1)
+    return text
 
 
 async def grab_message(ctx, identifier, expected_id_type: str):
-    """ Grab a certain message, based on the parameters. """
+    """ Grab a certain message, based on the parameters. Recent messages are
+    taken from `message_cache`, and older ones from Discord. """
     assert expected_id_type in ["message", "user"]
 
     result_message = None
 
+    if re.match(r"(\A\d{18}\Z)", identifier):
+        if expected_id_type == "message":
+            result_message = message_cache.get(ctx.channel.id, int(identifier))
+        elif expected_id_type == "user":
+            result_message = message_cache.last_by(ctx.channel.id, int(identifier), ctx.id)
+    elif identifier.strip() == "":
+        result_message = message_cache.before(ctx.channel.id, ctx.id)
+    if result_message is not None:
+        return result_message
+
     if re.match(r"(\A\d{18}\Z)", identifier):
         # Text is a message or user ID
 
         if expected_id_type == "message":
-            async for message in ctx.channel.history(limit=500):
-                if identifier == str(message.id):
-                    result_message = message
-                    break
+            metrics.message_fetches.inc()
+            try:
+                result_message = await ctx.channel.fetch_message(int(identifier))
+            except discord.HTTPException:
+                pass  # (Not found, or not allowed to see it.)
         elif expected_id_type == "user":
             # If the person calling is looking for their own last message,
             # ignore the very last message they sent, which will be the calling
             # message itself. There is potential for a race condition, but it's
             # low-stakes.
             calling_message_found = False
+            metrics.history_pages.inc()  # (100 messages to a page.)
             async for message in ctx.channel.history(limit=100):
                 if identifier == str(message.author.id):
                     if identifier == str(ctx.author.id) and calling_message_found == False:
@@ -55,6 +77,7 @@ async def grab_message(ctx, identifier, expected_id_type: str):
                         break
     elif identifier.strip() == "":
         # Grab message directly before user's, regardless of jumps in channel history.
+        metrics.history_pages.inc()
         history = await ctx.channel.history(limit=10).flatten()
         for i, message in enumerate(history):
             if ctx.id == message.id:
@@ -66,6 +89,91 @@ async def grab_message(ctx, identifier, expected_id_type: str):
     return result_message
 
 
+async def grab_reply(ctx):
+    """ Grab the message the calling message replies to. """
+    reference = ctx.reference
+
+    if isinstance(reference.resolved, discord.Message):
+        return reference.resolved
+
+    result_message = message_cache.get(reference.channel_id, reference.message_id)
+    if result_message is None:
+        metrics.message_fetches.inc()
+        try:
+            result_message = await ctx.channel.fetch_message(reference.message_id)
+        except discord.HTTPException:
+            pass
+    return result_message
+
+
+async def resolve_macros(ctx, text, triggers):
+    """ Replace $LAST and $MESSAGE macros with the text of the given messages.
+    Macros are taken from `triggers`, the matches of `macros.trigger_pattern` on the
+    text. The messages are all looked up at once, each with a timeout. """
+
+    # $LAST:  Last message in channel, or last message by a certain user
+    # in the channel if a user ID or @ is given. Implicit if the message
+    # starts with « | », in which case a message being replied to is used
+    # instead, if there is one.
+    #
+    # $MESSAGE: Message ID or link in same channel.
+
+    lookups = {}  # (type, identifier): coroutine
+    found_macros = []  # (span, lookup key, not found text), in order of the text
+
+    if text.startswith("|"):
+        # (The implied $LAST takes up no text.)
+        if ctx.reference is not None:
+            key = ("reply", "")
+            lookups[key] = grab_reply(ctx)
+        else:
+            key = ("user", "")
+            lookups[key] = grab_message(ctx, "", "user")
+        found_macros.append(((0, 0), key, "`$LAST: Message not found.`"))
+
+    # (Macros are only looked for in the text as sent, not in the text of the
+    # messages they're replaced with.)
+    for match in triggers:
+        if match["LAST"] is not None:
+            key = ("user", match["LAST_id"] or "")
+            if key not in lookups:
+                lookups[key] = grab_message(ctx, key[1], "user")
+            found_macros.append((match.span("LAST"), key, "`$LAST: Message not found.`"))
+        elif match["MESSAGE"] is not None:
+            key = ("message", match["MESSAGE_id"])
+            if key not in lookups:
+                lookups[key] = grab_message(ctx, key[1], "message")
+            found_macros.append((match.span("MESSAGE"), key, "`$MESSAGE: Message not found.`"))
+
+    async def lookup(key, coroutine):
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(coroutine, config.get("macro_timeout", 5.0))
+        except (asyncio.TimeoutError, discord.HTTPException):
+            return None
+        finally:
+            metrics.macro_series[key[0]].observe(time.perf_counter() - start)
+
+    messages = dict(
+        zip(lookups.keys(), await asyncio.gather(*map(lookup, lookups, lookups.values())))
+    )
+
+    pieces = []
+    end = 0
+    for (start, stop), key, not_found_text in found_macros:
+        message = messages[key]
+        if message is None:
+            message_text = not_found_text
+        else:
+            message_text = await clean_up_mentions(message, message.content)
+        pieces.append(text[end:start])
+        pieces.append(escape_dangerous_chars(message_text))
+        end = stop
+    pieces.append(text[end:])
+
+    return str().join(pieces)
+
+
 async def change_status_task():
     """ Replaces the status at 15 second intervals.  """
 
@@ -183,17 +291,69 @@ help_embeds["unknown"] = discord.Embed(
     title="**Unknown Argument**", description=unknown_description, color=0xFCF169
 )
 
-##### Create help decription embeds for each command.
-# Note: To generate each command's example output we have to run the command
-# callback. Since the callbacks are asyncronous, they must be run with
-# `async.run()`. `discord.Client()` expects to get the default inactive loop
-# and starts using that, but `asyncio.run()` completely deletes the default
-# loop, and the discord code fails. Hence why we save and reset the event loop
-# here.
-old_loop = asyncio.get_event_loop()
-for alias in commands.all_aliases:
-    command = commands.alias_map[alias]
-    example = asyncio.run(process_text(command['example']))
+##### Help decription embeds for each command.
+# These are made the first time they're asked for, as running every example
+# through the engine would slow down startup. Aliases of a command share its
+# embed. If `help_cache_file` is set (see startup), example results are kept
+# there between runs, for as long as the commands don't change.
+command_help_embeds = {}  # primary alias: Embed
+help_cache_file = None
+help_cache_hash = hashlib.sha256(
+    json.dumps(
+        [
+            {key: value for key, value in tc.items() if not callable(value)}
+            for tc in commands.text_commands
+        ],
+        sort_keys=True,
+    ).encode()
+).hexdigest()
+help_cache_examples = None  # primary alias: example result
+
+
+def load_help_cache():
+    """ Example results from `help_cache_file`, if it's for these commands. """
+    try:
+        with open(help_cache_file, "r") as f:
+            cache = json.load(f)
+        if cache["hash"] == help_cache_hash:
+            return cache["examples"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return {}
+
+
+def save_help_cache():
+    try:
+        help_cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(help_cache_file, "w") as f:
+            json.dump({"hash": help_cache_hash, "examples": help_cache_examples}, f)
+    except OSError:
+        pass  # (It's only a cache.)
+
+
+def command_help_embed(alias):
+    """ The help embed for the command with the given alias, or None if
+    there's no such command. """
+    global help_cache_examples
+
+    command = commands.alias_map.get(alias)
+    if command is None:
+        return None
+
+    primary_alias = command["aliases"][0]
+    embed = command_help_embeds.get(primary_alias)
+    if embed is not None:
+        return embed
+
+    if help_cache_examples is None:
+        help_cache_examples = {} if help_cache_file is None else load_help_cache()
+
+    example = help_cache_examples.get(primary_alias)
+    if example is None:
+        example = process_text_sync(command['example'])
+        help_cache_examples[primary_alias] = example
+        if help_cache_file is not None:
+            save_help_cache()
 
     command_description = (
         f"{command['description']}\n\n"
@@ -201,151 +361,377 @@ for alias in commands.all_aliases:
         + f"**Example:**\n{command['example']}\n{example}"
     )
 
-    help_embeds[alias] = discord.Embed(
-        title=f"**Command: `{alias}`**",
+    embed = discord.Embed(
+        title=f"**Command: `{primary_alias}`**",
         description=command_description,
         color=0xFCF169,
     )
-asyncio.set_event_loop(old_loop)
-
-### COMPILED REGEXES ######################################################
-# "|zalgo", "| mock"; Not "| randomtext"
-command_pattern = re.compile(commands.aliases_pattern_with_pipe)
-
-# Matches the $LAST macro if it's not preceded directly by a backslash or some
-# text. It also matches the user id, whether it be directly or in an @.
-# See `test.py` for succeeding and failing examples.
-#
-# Group 0: Whole match, whitespace stripped. For text replacement.
-# Group 1: The user ID. May be empty.
-macro_LAST_pattern = re.compile(
-    r"(?:[^\\\w]|^)(\$LAST(?:\s+<@(?:!)?)?(?:\s*(\d{18})(?:>)?)?)",
-    re.IGNORECASE
-)
+    command_help_embeds[primary_alias] = embed
+    return embed
 
-# Matches the $MESSAGE macro in much in the same way as $LAST. Looks for
-# message IDs instead of user IDs. If there's a message link and not an ID, it
-# grabs the ID from the end of the link. Unlike $LAST, it won't match if there's
-# no ID / link, as $MESSAGE on its own is semantically meaningless.
-#
-# Group 0: Whole match, whitespace stripped. For text replacement.
-# Group 1: The message ID. Won't match if it doesn't exist.
-macro_MESSAGE_pattern = re.compile(
-    r"(?:[^\\\w]|^)(\$MESSAGE\s+(?:https://discord\.com/channels/\d{18}/\d{18}/)?(\d{18}))",
-    re.IGNORECASE
-)
 
 ### BOT CALLBACKS #########################################################
-client = discord.Client()
+# The client is made by `create_client`, which registers these callbacks.
+client = None
+message_cache = MessageCache()
+send_queue = SendQueue()
+admission = Admission()
 
 
-@client.event
 async def on_ready():
+    global metrics_server, health_task
+
     if platform.system() == "OpenBSD":
         openbsd.unveil("/etc/ssl/certs", "r")
         openbsd.unveil("/usr/local/lib/python3.8/", "r")
-        openbsd.pledge("stdio inet dns prot_exec rpath")
+        openbsd.pledge("stdio inet dns prot_exec rpath proc")
 
+    # (on_ready is run again after reconnecting, so these are started once.)
+    if health_queue is not None and health_task is None:
+        health_task = client.loop.create_task(report_health_task())
+    if metrics_address is not None and metrics_server is None:
+        metrics_server = await metrics.serve(*metrics_address)
     await client.loop.create_task(change_status_task())
 
 
-@client.event
 async def on_message(ctx):
+    message_cache.add(ctx)
     text = ctx.content.strip()
 
     ##### Ignore messages from self
     if ctx.author.id == client.user.id:
         return
 
-    elif not (
-        re.search(command_pattern, text) is None
-        and re.search(macro_MESSAGE_pattern, text) is None
-        and re.search(macro_LAST_pattern, text) is None
-    ):
-        # (At least one pipe+command or macro has been found.)
+    # (The matches are only used to resolve macros. Replacing them moves the
+    # rest of the text, and the parser skips literal text on its own, with
+    # one search for the first special character. See `toProgram_sync`.)
+    triggers = macros.find_triggers(text)
 
-        ##### Replace $LAST and $MESSAGE macros
-        # Macros are replaced with the given message's text, if possible. The
-        # text itself will have special characters escaped. See start of file
-        # for detailed explanation of the regexes.
-        #
-        # $LAST:  Last message in channel, or last message by a certain user
-        # in the channel if a user ID or @ is given. Implicit if the message
-        # starts with « | ».
-        #
-        # $MESSAGE: Message ID or link in same channel.
-
-        if text.startswith("|"):
-            text = "$LAST" + text
-
-        LAST_macro_cache = {}
-        MESSAGE_macro_cache = {}
-
-        for LAST_macro in macro_LAST_pattern.findall(text):
-            if LAST_macro[1] in LAST_macro_cache.keys():
-                message_text = LAST_macro_cache[LAST_macro[1]]
-            else:
-                message = await grab_message(ctx, LAST_macro[1], "user")
-                if message is None:
-                    message_text = "`$LAST: Message not found.`"
-                else:
-                    message_text = await clean_up_mentions(message, message.content)
-                    LAST_macro_cache[LAST_macro[1]] = message_text
-            text = await safely_replace_substr(text, LAST_macro[0], message_text)
+    if triggers:
+        # (At least one pipe+command or macro has been found.)
 
-        for MESSAGE_macro in macro_MESSAGE_pattern.findall(text):
-            if MESSAGE_macro[1] in MESSAGE_macro_cache.keys():
-                message_text = MESSAGE_macro_cache[MESSAGE_macro[1]]
-            else:
-                message = await grab_message(ctx, MESSAGE_macro[1], "message")
-                if message is None:
-                    message_text = "`$MESSAGE: Message not found.`"
-                else:
-                    message_text = await clean_up_mentions(message, message.content)
-                    MESSAGE_macro_cache[MESSAGE_macro[1]] = message_text
-            text = await safely_replace_substr(text, MESSAGE_macro[0], message_text)
+        # (The reply's place in the channel's queue is reserved before any
+        # `await`, so replies are sent in the order messages came in. See
+        # `send_queue.py`.)
+        with send_queue.reserve(ctx.channel) as reply:
+
+            ##### Replace $LAST and $MESSAGE macros
+            # Macros are replaced with the given message's text, if possible.
+            # The text itself will have special characters escaped. See start
+            # of file for detailed explanation of the regexes.
+            text = await resolve_macros(ctx, text, triggers)
+
+            ##### Cost
+            # The text is parsed once, here, within the time budget, for
+            # admission, the executor and metrics. (A macro can stand where a
+            # command goes, so it's parsed after they're replaced.) Text that
+            # can't be parsed can only give that error, so it's the reply.
+            # Running out of budget costs as much as the heaviest commands.
+            try:
+                AST = toAST_sync(text, text_transform.Budget(executor.time_budget))
+                cost = text_transform.pipeline_cost(AST)
+            except PipeBotError as e:
+                AST = None
+                cost = "heavy" if isinstance(e, text_transform.BudgetError) else "light"
+                processed_text = text_transform.error_text(e)
+
+            ##### Admission
+            # Each user, channel and guild can only give the bot so much work.
+            # See `admission.py`.
+            wait = admission.admit(
+                admission.cost(len(text), cost),
+                user=ctx.author.id,
+                channel=ctx.channel.id,
+                guild=ctx.guild and ctx.guild.id,
+            )
+            if wait is None:
+                if admission.notify(ctx.author.id):
+                    reply.send("`INFO: You're sending too much at once. Please slow down.`")
+                return
+            elif wait > 0:
+                await asyncio.sleep(wait)
+
+            ##### Process pipe commands
+            max_response_length = min(2000, int(config["max_response_length"]))
+            if AST is not None:
+                processed_text = await executor.process_text(
+                    text, max_length=max_response_length, cost=cost
+                )
+            clean_processed_text = await clean_up_mentions(ctx, processed_text)
 
-        ##### Process pipe commands
-        processed_text = await process_text(text)
-        clean_processed_text = await clean_up_mentions(ctx, processed_text)
+            # (Commands are counted from the AST parsed above.)
+            if metrics_address is not None:
+                if AST is not None:
+                    metrics.count_commands(AST)
+                if processed_text.startswith("`ERROR: "):
+                    metrics.count_error(processed_text)
 
-        if clean_processed_text != "":
-            max_response_length = min(2000, int(config["max_response_length"]))
-            response_length = len(clean_processed_text)
+            if clean_processed_text != "":
+                response_length = len(clean_processed_text)
+                metrics.reply_length.observe(response_length)
 
-            if response_length > max_response_length:
-                await ctx.channel.send(f"`INFO: Response too long. {response_length}/{max_response_length}`")
+                if response_length > max_response_length:
+                    reply.send(f"`INFO: Response too long. {response_length}/{max_response_length}`")
+                else:
+                    reply.send(clean_processed_text)
             else:
-                await ctx.channel.send(clean_processed_text)
-        else:
-            await ctx.channel.send(
-                "`INFO: Cannot send an empty message. This usually occurs when using $LAST on an embed.`"
-            )
+                reply.send(
+                    "`INFO: Cannot send an empty message. This usually occurs when using $LAST on an embed.`"
+                )
 
     ##### Help messages
     elif text.lower().strip().startswith(f"<@!{client.user.id}>"):
-        try:
-            argument = text.lower().split()[1].strip()
+        with send_queue.reserve(ctx.channel) as reply:
             try:
-                await ctx.channel.send(embed=help_embeds[argument])
-            except KeyError:
-                await ctx.channel.send(embed=help_embeds["unknown"])
-        except IndexError:
-            await ctx.channel.send(embed=help_embeds["basics"])
+                argument = text.lower().split()[1].strip()
+                embed = help_embeds.get(argument) or command_help_embed(argument)
+                if embed is not None:
+                    reply.send(embed=embed)
+                else:
+                    reply.send(embed=help_embeds["unknown"])
+            except IndexError:
+                reply.send(embed=help_embeds["basics"])
+
+
+async def on_raw_message_edit(payload):
+    # (Raw, as `on_message_edit` is only called for messages still in
+    # discord.py's own cache, which holds far fewer than `message_cache`.
+    # Those are the same objects, and discord.py has already updated them.
+    # The rest are updated in place, the way discord.py does it.)
+    if payload.cached_message is not None:
+        return
+    message = message_cache.peek(payload.channel_id, payload.message_id)
+    if message is not None:
+        message._update(payload.data)
+
+
+async def on_raw_message_delete(payload):
+    message_cache.remove(payload.channel_id, payload.message_id)
+
+
+async def on_raw_bulk_message_delete(payload):
+    for message_id in payload.message_ids:
+        message_cache.remove(payload.channel_id, message_id)
+
+
+def create_client(shard_ids=None, shard_count=None):
+    """ Makes the client, with the callbacks above. If `shard_ids` is given,
+    it connects to only those shards, out of `shard_count`. """
+    global client
+
+    if shard_ids is None:
+        client = discord.Client()
+    else:
+        client = discord.AutoShardedClient(shard_ids=shard_ids, shard_count=shard_count)
+
+    for callback in [
+        on_ready,
+        on_message,
+        on_raw_message_edit,
+        on_raw_message_delete,
+        on_raw_bulk_message_delete,
+    ]:
+        client.event(callback)
+
+    return client
+
+
+### HEALTH ################################################################
+# When run as a worker of `supervisor.py`, the bot reports on its health to
+# the supervisor every `health_interval` seconds.
+health_queue = None
+health_task = None
+worker_index = None
+health_interval = 15
+
+
+async def report_health_task():
+    while True:
+        health_queue.put(
+            {
+                "worker": worker_index,
+                "time": time.time(),
+                "shards": sorted(client.shards),
+                "latency": client.latency,
+                "guilds": len(client.guilds),
+                "timeouts": text_transform.timeouts,
+                "send_queue": len(send_queue),
+            }
+        )
+        await asyncio.sleep(health_interval)
+
+
+### METRICS ###############################################################
+# Served on `metrics_address` (from the `[metrics]` section of `config.toml`)
+# if it's set. See `metrics.py`.
+metrics_address = None
+metrics_server = None
+
+
+def watch_stats():
+    """ Exports the counts kept by each part of the bot. """
+    caches = {
+        ("ast",): text_transform.ast_cache,
+        ("result",): text_transform.result_cache,
+        ("message",): message_cache,
+    }
+    metrics.watch(
+        "pipebot_cache_hits_total",
+        "Cache hits.",
+        "counter",
+        lambda: {labels: cache.hits for labels, cache in caches.items()},
+        ("cache",),
+    )
+    metrics.watch(
+        "pipebot_cache_misses_total",
+        "Cache misses.",
+        "counter",
+        lambda: {labels: cache.misses for labels, cache in caches.items()},
+        ("cache",),
+    )
+    metrics.watch(
+        "pipebot_cache_hit_rate",
+        "Cache hits, out of all lookups.",
+        "gauge",
+        lambda: {labels: cache.hit_rate for labels, cache in caches.items()},
+        ("cache",),
+    )
+    metrics.watch(
+        "pipebot_timeouts_total",
+        "Requests cancelled for going over their time budget.",
+        "counter",
+        lambda: text_transform.timeouts,
+    )
+    metrics.watch(
+        "pipebot_trigger_checks_total",
+        "Messages checked for commands and macros.",
+        "counter",
+        lambda: {("gated",): macros.gated_messages, ("passed",): macros.passed_messages},
+        ("result",),
+    )
+
+    ##### Executor
+    metrics.watch(
+        "pipebot_executor_jobs_total",
+        "Requests run, by where they were run.",
+        "counter",
+        lambda: {
+            ("inline",): executor.inline_jobs,
+            **{(pool,): stats.jobs for pool, stats in executor.stats.items()},
+        },
+        ("pool",),
+    )
+    metrics.watch(
+        "pipebot_executor_queued",
+        "Requests waiting for or running in a pool.",
+        "gauge",
+        lambda: {(pool,): stats.queued for pool, stats in executor.stats.items()},
+        ("pool",),
+    )
+    metrics.watch(
+        "pipebot_executor_wait_seconds_total",
+        "Time requests spent waiting for a pool.",
+        "counter",
+        lambda: {(pool,): stats.total_wait for pool, stats in executor.stats.items()},
+        ("pool",),
+    )
+
+    ##### Send queue and admission
+    send_queue.observe_latency = metrics.send_seconds.observe
+    metrics.watch(
+        "pipebot_send_queue_depth",
+        "Replies waiting to be sent.",
+        "gauge",
+        lambda: len(send_queue),
+    )
+    metrics.watch(
+        "pipebot_replies_coalesced_total",
+        "INFO replies sent as part of another message.",
+        "counter",
+        lambda: send_queue.coalesced,
+    )
+    metrics.watch(
+        "pipebot_send_errors_total",
+        "Replies that couldn't be sent.",
+        "counter",
+        lambda: send_queue.errors,
+    )
+    metrics.watch(
+        "pipebot_admission_total",
+        "Requests by admission result. (Delayed requests ran after a wait.)",
+        "counter",
+        lambda: {
+            ("admitted",): admission.admitted - admission.delayed,
+            ("delayed",): admission.delayed,
+            ("rejected",): admission.rejected,
+        },
+        ("result",),
+    )
+    metrics.watch(
+        "pipebot_admission_buckets",
+        "Token buckets in memory.",
+        "gauge",
+        lambda: len(admission),
+    )
 
 
 ### BOT STARTUP ###########################################################
-if __name__ == "__main__":
+# (Platform agnostic config file path.)
+config_dir = pathlib.Path(appdirs.user_config_dir("pipebot"))
+config_file = config_dir.joinpath("config.toml")
+
+
+def load_config():
+    with open(config_file, "r") as f:
+        return toml.load(f)
 
-    # (Platform agnostic config file path.)
-    config_dir = pathlib.Path(appdirs.user_config_dir("pipebot"))
-    config_file = config_dir.joinpath("config.toml")
 
+def close_on_sigterm(signum, frame):
+    """ Closes the client, so that `run` returns and shuts the executor down,
+    rather than dying and leaving the pool's processes behind. (Workers of
+    `supervisor.py` are stopped with SIGTERM.) """
+    client.loop.call_soon_threadsafe(client.loop.create_task, client.close())
+
+
+def run(config_, shard_ids=None, shard_count=None, worker=None, health_queue_=None):
+    """ Runs the bot until it disconnects. See `create_client` for the
+    shards, and `supervisor.py` for the worker and health queue. """
+    global config, message_cache, send_queue, admission, executor, help_cache_file
+    global health_queue, worker_index, metrics_address
+
+    config = config_
+    worker_index = worker
+    health_queue = health_queue_
+
+    if config.get("help_cache", True):
+        help_cache_file = pathlib.Path(appdirs.user_cache_dir("pipebot"), "help.json")
+    message_cache = MessageCache(**config.get("message_cache", {}))
+    send_queue = SendQueue(**config.get("send_queue", {}))
+    admission = Admission(**config.get("admission", {}))
+    executor = Executor(
+        **config.get("executor", {}), time_budget=config.get("time_budget")
+    )
+
+    metrics_config = config.get("metrics", {})
+    if metrics_config.get("enabled", False):
+        metrics_address = (
+            metrics_config.get("host", "127.0.0.1"),
+            metrics_config.get("port", 9180) + (worker or 0),
+        )
+        watch_stats()
+
+    create_client(shard_ids, shard_count)
+    signal.signal(signal.SIGTERM, close_on_sigterm)
     try:
-        with open(config_file, "r") as f:
-            config = toml.load(f)
-        
         client.run(config["key"])
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)  # (Already stopping.)
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    try:
+        run(load_config())
 
     except FileNotFoundError:
         print(f'No config found at "{config_file}"')
@@ -360,7 +746,48 @@ if __name__ == "__main__":
             else:
                 print("Defaulting to 2000")
                 config["max_response_length"] = 2000
-                
+
+            # (Keep the results of command examples, for help, between runs.)
+            config["help_cache"] = True
+
+            # (Seconds to wait for each $LAST or $MESSAGE lookup.)
+            config["macro_timeout"] = 5.0
+
+            # (CPU seconds per message. See `text_transform.py`.)
+            config["time_budget"] = 2.0
+
+            # (See `executor.py`.)
+            config["executor"] = {
+                "thread_workers": 2,
+                "process_workers": 1,
+                "inline_max_length": 1000,
+            }
+
+            # (See `message_cache.py`.)
+            config["message_cache"] = {"max_messages": 500, "max_channels": 1000}
+
+            # (See `send_queue.py`.)
+            config["send_queue"] = {
+                "channel_limit": 5,
+                "channel_period": 5.0,
+                "global_limit": 50,
+                "global_period": 1.0,
+            }
+
+            # (Tokens are characters times weight. See `admission.py`.)
+            config["admission"] = {
+                "max_delay": 2.0,
+                "user": {"capacity": 40_000, "rate": 2_000},
+                "channel": {"capacity": 100_000, "rate": 5_000},
+                "guild": {"capacity": 200_000, "rate": 10_000},
+                "weights": {"light": 1, "native": 2, "heavy": 10},
+            }
+
+            # (Address to serve metrics on. See `metrics.py`.)
+            config["metrics"] = {"enabled": False, "host": "127.0.0.1", "port": 9180}
+
+            # (Used when run with `supervisor.py`. See there.)
+            config["shards"] = {"count": 1, "workers": 1}
 
             config_dir.mkdir(parents=True, exist_ok=True)
             with open(config_file, "w+") as f:
@@ -0,0 +1,122 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Recent messages per channel, kept in memory for $LAST and $MESSAGE.
+#
+# Looking a message up through `channel.history` takes a REST request per 100
+# messages, all counted against Discord's rate limits. Instead, every message
+# the bot sees is kept in a bounded buffer for its channel, indexed by message
+# ID and by author, and kept up to date on edits and deletes. Lookups that
+# aren't in the buffer (ie. messages from before the bot started) return None,
+# and the caller falls back to the channel history.
+#
+# Sizes are set in the `[message_cache]` section of `config.toml`.
+
+from collections import OrderedDict
+
+
+class ChannelBuffer:
+    """ The most recent messages of one channel, oldest first. """
+
+    def __init__(self, max_messages: int):
+        self.max_messages = max_messages
+        self.messages: OrderedDict = OrderedDict()  # message ID: message
+        self.by_author: dict = {}  # author ID: OrderedDict(message ID: message)
+
+    def add(self, message) -> None:
+        author_messages = self.by_author.setdefault(message.author.id, OrderedDict())
+        self.messages[message.id] = message
+        author_messages[message.id] = message
+
+        while len(self.messages) > self.max_messages:
+            self.remove(next(iter(self.messages)))
+
+    def remove(self, message_id: int) -> None:
+        message = self.messages.pop(message_id, None)
+        if message is None:
+            return
+
+        author_messages = self.by_author[message.author.id]
+        del author_messages[message_id]
+        if not author_messages:
+            del self.by_author[message.author.id]
+
+    def last_by(self, author_id: int, before_id: int):
+        """ The author's last message before the given message, or None. """
+        for message_id in reversed(self.by_author.get(author_id, ())):
+            if message_id < before_id:
+                return self.messages[message_id]
+        return None
+
+    def before(self, message_id: int):
+        """ The message directly before the given one, or None if that isn't
+        known. """
+        previous = False
+        for id_ in reversed(self.messages):
+            if previous:
+                return self.messages[id_]
+            previous = id_ == message_id
+        return None
+
+
+class MessageCache:
+    """ A `ChannelBuffer` for each of the most recently active channels.
+    Lookups are counted in `hits` and `misses`. """
+
+    def __init__(self, max_messages=500, max_channels=1000):
+        self.max_messages = max_messages
+        self.max_channels = max_channels
+        self.hits = 0
+        self.misses = 0
+        self._channels: OrderedDict = OrderedDict()  # channel ID: ChannelBuffer
+
+    def __len__(self) -> int:
+        return sum(len(channel.messages) for channel in self._channels.values())
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _count(self, result):
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def add(self, message) -> None:
+        channel_id = message.channel.id
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self._channels[channel_id] = ChannelBuffer(self.max_messages)
+            if len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+        else:
+            self._channels.move_to_end(channel_id)
+        channel.add(message)
+
+    def peek(self, channel_id: int, message_id: int):
+        """ A message by its ID, or None, without counting the lookup (ie. to
+        update it after an edit). """
+        channel = self._channels.get(channel_id)
+        return channel and channel.messages.get(message_id)
+
+    def remove(self, channel_id: int, message_id: int) -> None:
+        channel = self._channels.get(channel_id)
+        if channel is not None:
+            channel.remove(message_id)
+
+    def get(self, channel_id: int, message_id: int):
+        """ A message by its ID, or None. """
+        channel = self._channels.get(channel_id)
+        return self._count(channel and channel.messages.get(message_id))
+
+    def last_by(self, channel_id: int, author_id: int, before_id: int):
+        """ An author's last message before the given message, or None. """
+        channel = self._channels.get(channel_id)
+        return self._count(channel and channel.last_by(author_id, before_id))
+
+    def before(self, channel_id: int, message_id: int):
+        """ The message directly before the given one, or None. """
+        channel = self._channels.get(channel_id)
+        return self._count(channel and channel.before(message_id))
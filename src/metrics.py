@@ -0,0 +1,296 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Metrics, served over HTTP in Prometheus' text format.
+#
+# Enabled by the `[metrics]` section of `config.toml`, which gives the address
+# to serve them on (`http://host:port/metrics`). Workers of `supervisor.py`
+# each serve on `port` plus their worker index.
+#
+# Every series is made once, up front, and bound to a name here (or in a dict
+# of label values), so recording is an attribute lookup and an addition, with
+# nothing allocated per call. The engine is timed through hooks in
+# `text_transform.py`, which are only set by `install`, so it isn't timed at
+# all unless metrics are enabled. (Stages and callbacks are timed in the
+# process they run in, so work sent to the executor's process pool isn't
+# included in them.)
+#
+# Counters kept elsewhere (caches, executor pools, and so on) are read when
+# metrics are scraped, by the functions given to `watch`.
+
+from bisect import bisect_left
+from typing import Callable, Dict, Tuple
+import asyncio
+import re
+import time
+
+from engine import commands, text_transform
+
+# Upper bounds, in seconds, for latency histograms.
+SECONDS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+# Upper bounds, in characters, for the length of replies.
+LENGTHS = (0, 10, 50, 100, 250, 500, 1000, 1500, 2000)
+
+
+### SERIES ################################################################
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1) -> None:
+        self.value += amount
+
+    def samples(self, name: str, labels: str):
+        yield f"{name}{labels}", self.value
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # (The last is +Inf.)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: str):
+        # (Buckets are cumulative, and labelled with their upper bound.)
+        inner = labels[1:-1] + "," if labels else ""
+        total = 0
+        for bound, count in zip(self.bounds + ("+Inf",), self.counts):
+            total += count
+            yield f'{name}_bucket{{{inner}le="{bound}"}}', total
+        yield f"{name}_sum{labels}", self.sum
+        yield f"{name}_count{labels}", total
+
+
+class Metric:
+    """ A named set of series, one for each combination of label values. """
+
+    def __init__(self, name: str, help_: str, type_: str, labels=(), bounds=SECONDS):
+        self.name = name
+        self.help = help_
+        self.type = type_
+        self.label_names = labels
+        self.bounds = bounds
+        self.series: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """ The series for the given label values. Bind it once, rather than
+        calling this for every value recorded. """
+        series = self.series.get(values)
+        if series is None:
+            series = Histogram(self.bounds) if self.type == "histogram" else Counter()
+            self.series[values] = series
+        return series
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        for values, series in list(self.series.items()):
+            labels = format_labels(self.label_names, values)
+            for name, value in series.samples(self.name, labels):
+                yield f"{name} {value}"
+
+
+class Watched:
+    """ Values kept elsewhere, read when metrics are scraped. `read` returns
+    a number, or a dict of label values (as tuples) to numbers. """
+
+    def __init__(self, name: str, help_: str, type_: str, read: Callable, labels=()):
+        self.name = name
+        self.help = help_
+        self.type = type_
+        self.label_names = labels
+        self.read = read
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            yield f"{self.name}{format_labels(self.label_names, label_values)} {value}"
+
+
+def format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = (
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+### REGISTRY ##############################################################
+registry: list = []
+
+
+def metric(name, help_, type_, labels=(), bounds=SECONDS) -> Metric:
+    m = Metric(name, help_, type_, labels, bounds)
+    registry.append(m)
+    return m
+
+
+def render() -> str:
+    return "\n".join(line for m in registry for line in m.render()) + "\n"
+
+
+##### Engine
+stage_seconds = metric(
+    "pipebot_stage_seconds",
+    "Time spent in each stage of the engine. (Text is only tokenized and parsed on AST cache misses.)",
+    "histogram",
+    ("stage",),
+)
+tokenize_seconds = stage_seconds.labels("tokenize")
+parse_seconds = stage_seconds.labels("parse")
+generate_seconds = stage_seconds.labels("generate")
+
+callback_seconds = metric(
+    "pipebot_callback_seconds",
+    "Time spent in command callbacks. Runs of fused per-character commands are timed together.",
+    "histogram",
+    ("command",),
+)
+command_calls = metric(
+    "pipebot_commands_total", "Commands in processed messages.", "counter", ("command",)
+)
+
+# (Both keyed by every alias, for each command's first alias.)
+callback_series = {}
+command_series = {}
+for alias, command in commands.alias_map.items():
+    callback_series[alias] = callback_seconds.labels(command["aliases"][0])
+    command_series[alias] = command_calls.labels(command["aliases"][0])
+fused_seconds = callback_seconds.labels("fused")
+
+errors = metric(
+    "pipebot_errors_total", "Error replies, by kind of error.", "counter", ("error",)
+)
+error_series: dict = {}  # Error message: Counter
+
+##### Discord
+macro_seconds = metric(
+    "pipebot_macro_seconds", "Time to look up the message of a macro.", "histogram", ("macro",)
+)
+macro_series = {
+    "user": macro_seconds.labels("LAST"),
+    "message": macro_seconds.labels("MESSAGE"),
+    "reply": macro_seconds.labels("reply"),
+}
+message_fetches = metric(
+    "pipebot_message_fetches_total", "Messages fetched from Discord by ID.", "counter"
+).labels()
+history_pages = metric(
+    "pipebot_history_pages_total", "Pages of channel history fetched from Discord.", "counter"
+).labels()
+send_seconds = metric(
+    "pipebot_send_seconds", "Time from a message arriving to its reply being sent.", "histogram"
+).labels()
+reply_length = metric(
+    "pipebot_reply_length", "Length of replies, in characters.", "histogram", bounds=LENGTHS
+).labels()
+loop_lag_seconds = metric(
+    "pipebot_event_loop_lag_seconds", "How late the event loop runs a timer.", "histogram"
+).labels()
+
+
+### RECORDING #############################################################
+def observe_step(step, seconds: float) -> None:
+    if isinstance(step, text_transform.FusedTable):
+        fused_seconds.observe(seconds)
+    else:
+        callback_series[step.alias].observe(seconds)
+
+
+def count_commands(group) -> None:
+    """ Counts the commands in an AST. """
+    groups = [group]
+    while groups:
+        group = groups.pop()
+        for command in group.commands:
+            command_series[command.alias.lower()].inc()
+        groups.extend(c for c in group.content if isinstance(c, text_transform.Group))
+
+
+# (Messages without their details, ie. positions, names, limits and
+# lengths, so there are only so many kinds of error.)
+error_details_pattern = re.compile(r"^\s*\d+, \d+: |\s*[(~\"].*|\s+\d[\d+/]*", re.DOTALL)
+
+# Kinds of error with a series of their own. Any others are counted as
+# "other", so the endpoint can't grow without bound.
+MAX_ERROR_KINDS = 50
+
+
+def count_error(reply: str) -> None:
+    """ Counts an "`ERROR: ...`" reply. """
+    message = reply[len("`ERROR: ") : -1]
+    series = error_series.get(message)
+    if series is None:
+        kind = error_details_pattern.sub("", message).rstrip(" .")
+        if (kind,) not in errors.series and len(errors.series) >= MAX_ERROR_KINDS:
+            kind = "other"
+        series = errors.labels(kind)
+        if len(error_series) < 1000:
+            error_series[message] = series
+    series.inc()
+
+
+def install() -> None:
+    """ Sets the engine's hooks, so it's timed. """
+    text_transform.observe_tokenize = tokenize_seconds.observe
+    text_transform.observe_parse = parse_seconds.observe
+    text_transform.observe_generate = generate_seconds.observe
+    text_transform.observe_step = observe_step
+
+
+def watch(name, help_, type_, read, labels=()) -> None:
+    registry.append(Watched(name, help_, type_, read, labels))
+
+
+async def loop_lag_task(interval=1.0):
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        loop_lag_seconds.observe(max(0.0, time.monotonic() - start - interval))
+
+
+### SERVER ################################################################
+async def handle_request(reader, writer):
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+        path = request.split(b" ", 2)[1] if request.count(b" ") >= 2 else b""
+
+        if path.split(b"?")[0] == b"/metrics":
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"Not found. Try /metrics.\n"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        pass  # (Not a request.)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=9180, lag_interval=1.0) -> asyncio.AbstractServer:
+    """ Starts the HTTP server, and timing the event loop. """
+    install()
+    asyncio.get_running_loop().create_task(loop_lag_task(lag_interval))
+    return await asyncio.start_server(handle_request, host, port)
@@ -0,0 +1,196 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Replies, queued per channel and sent in the order their messages arrived.
+#
+# Messages are processed concurrently, so a reply to a long message could
+# otherwise be sent after the reply to a short message that came later. Each
+# message reserves its place in its channel's queue as soon as it arrives (with
+# `reserve`), and fills it in once its reply is ready. A task per channel sends
+# the replies from the front of the queue as they're filled in.
+#
+# Discord limits how often the bot can send messages, per channel and overall.
+# Sending past the limits makes the bot wait (and retry) on a 429 response, so
+# the limits are tracked here instead, and each queue waits until it can send.
+# While it waits, `INFO:` replies (errors) pile up behind it, and those next to
+# each other are sent as one message, so a burst of errors isn't a burst of
+# messages.
+#
+# Limits are set in the `[send_queue]` section of `config.toml`.
+
+from collections import deque
+from typing import Optional
+import asyncio
+import time
+
+MAX_MESSAGE_LENGTH = 2000
+
+
+def is_info(content) -> bool:
+    return isinstance(content, str) and content.startswith("`INFO:")
+
+
+def coalesce(infos: list) -> str:
+    """ Joins INFO messages into one, counting repeats. """
+    counts = {}
+    for info in infos:
+        counts[info] = counts.get(info, 0) + 1
+    return "\n".join(
+        info if count == 1 else f"{info} (x{count})" for info, count in counts.items()
+    )
+
+
+class RateBucket:
+    """ At most `limit` sends in any `period` seconds. """
+
+    def __init__(self, limit: int, period: float):
+        self.limit = limit
+        self.period = period
+        self.sent = deque(maxlen=limit)  # Times of the most recent sends.
+
+    def delay(self) -> float:
+        """ Seconds to wait before the next send. """
+        if len(self.sent) < self.limit:
+            return 0.0
+        return max(0.0, self.sent[0] + self.period - time.monotonic())
+
+    def take(self) -> None:
+        self.sent.append(time.monotonic())
+
+
+class Reply:
+    """ A place in a channel's queue. Filled in with `send`, or given up with
+    `cancel`, or when used as a context manager, on leaving it. """
+
+    __slots__ = ("reserved", "ready", "content", "embed")
+
+    def __init__(self):
+        self.reserved = time.monotonic()
+        self.ready = asyncio.Event()
+        self.content = None
+        self.embed = None
+
+    def send(self, content: Optional[str] = None, embed=None) -> None:
+        if not self.ready.is_set():
+            self.content = content
+            self.embed = embed
+            self.ready.set()
+
+    def cancel(self) -> None:
+        self.ready.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # (If the reply was never sent, the queue mustn't wait on it forever.)
+        self.cancel()
+
+
+class ChannelQueue:
+    def __init__(self, channel, limit: int, period: float):
+        self.channel = channel
+        self.replies = deque()
+        self.bucket = RateBucket(limit, period)
+        self.task = None
+
+
+class SendQueue:
+    """ A `ChannelQueue` for each channel with replies waiting. Queue depth
+    and the time from `reserve` to sending are measured. """
+
+    def __init__(self, channel_limit=5, channel_period=5.0, global_limit=50, global_period=1.0):
+        self.channel_limit = channel_limit
+        self.channel_period = channel_period
+        self.bucket = RateBucket(global_limit, global_period)
+        self._channels = {}  # channel ID: ChannelQueue
+
+        self.queued = 0  # Reserved, but not sent.
+        self.max_queued = 0
+        self.sends = 0
+        self.coalesced = 0  # Replies sent as part of another message.
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.observe_latency = None  # (Set by `metrics.py`.)
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.sends if self.sends else 0.0
+
+    def __len__(self) -> int:
+        return self.queued
+
+    def reserve(self, channel) -> Reply:
+        """ Reserves the next place in the channel's queue. Call before the
+        first `await` of a message's handler, to keep replies in order. """
+        queue = self._channels.get(channel.id)
+        if queue is None:
+            queue = ChannelQueue(channel, self.channel_limit, self.channel_period)
+            self._channels[channel.id] = queue
+
+        reply = Reply()
+        queue.replies.append(reply)
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+
+        if queue.task is None:
+            queue.task = asyncio.get_running_loop().create_task(self._drain(queue))
+        return reply
+
+    async def _drain(self, queue: ChannelQueue) -> None:
+        replies = queue.replies
+        try:
+            while replies:
+                await replies[0].ready.wait()
+
+                if replies[0].content is None and replies[0].embed is None:
+                    self.queued -= 1
+                    replies.popleft()
+                    continue
+
+                delay = max(queue.bucket.delay(), self.bucket.delay())
+                while delay > 0:
+                    await asyncio.sleep(delay)
+                    delay = max(queue.bucket.delay(), self.bucket.delay())
+
+                # (Replies that were filled in while waiting can be sent too.)
+                batch = [replies.popleft()]
+                if is_info(batch[0].content) and batch[0].embed is None:
+                    length = len(batch[0].content)
+                    while (
+                        replies
+                        and replies[0].ready.is_set()
+                        and is_info(replies[0].content)
+                        and replies[0].embed is None
+                        and length + len(replies[0].content) + 1 <= MAX_MESSAGE_LENGTH
+                    ):
+                        length += len(replies[0].content) + 1
+                        batch.append(replies.popleft())
+                self.queued -= len(batch)
+
+                queue.bucket.take()
+                self.bucket.take()
+                if len(batch) > 1:
+                    content = coalesce([reply.content for reply in batch])
+                    self.coalesced += len(batch) - 1
+                else:
+                    content = batch[0].content
+                try:
+                    await queue.channel.send(content, embed=batch[0].embed)
+                except Exception as e:
+                    # (A failed send mustn't hold up the replies after it.)
+                    self.errors += 1
+                    print(f"Couldn't send reply: {e}")
+
+                now = time.monotonic()
+                for reply in batch:
+                    latency = now - reply.reserved
+                    self.sends += 1
+                    self.total_latency += latency
+                    self.max_latency = max(self.max_latency, latency)
+                    if self.observe_latency is not None:
+                        self.observe_latency(latency)
+        finally:
+            queue.task = None
+            if not replies:
+                del self._channels[queue.channel.id]
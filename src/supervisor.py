@@ -0,0 +1,211 @@
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Runs the bot's shards across several worker processes. Run with
+# `python supervisor.py`, after `main.py` has made `config.toml`.
+#
+# A single client handles every guild on one event loop, and so one core. With
+# sharding, Discord splits the guilds between `count` shards, and each worker
+# process runs an `AutoShardedClient` for some of them (shard IDs are dealt out
+# round robin). The `[shards]` section of `config.toml` sets:
+#
+#   - `count`: the total number of shards. Every worker must agree on it.
+#   - `ids`: the shards run here (default: all of them), so shards can be
+#     split between machines as well.
+#   - `workers`: the number of processes to split them between.
+#   - `health_timeout`: seconds without a health report before a worker is
+#     thought to be stuck, and restarted.
+#
+# Workers report their health every few seconds (see `report_health_task` in
+# `main.py`), which is summarised here. Workers that die or stop reporting are
+# restarted, waiting longer each time one fails soon after starting.
+
+import multiprocessing
+import queue
+import signal
+import time
+
+BACKOFF_MIN = 1  # seconds
+BACKOFF_MAX = 60
+
+# A worker that's run this long is thought to be healthy again, and its
+# backoff is reset.
+STABLE_TIME = 300
+
+SUMMARY_INTERVAL = 60
+
+# Seconds a worker is given to close its connection and pools when stopped,
+# before it's killed.
+STOP_TIMEOUT = 10
+
+
+def exit_on_sigterm(signum, frame):
+    """ Exits the supervisor the way Ctrl-C does, so its workers are stopped
+    (ie. when it's stopped as a service). """
+    raise SystemExit(0)
+
+
+def run_worker(config, index, shard_ids, shard_count, health_queue):
+    # (Imported here, so the supervisor itself doesn't need Discord.)
+    import main
+
+    main.run(config, shard_ids, shard_count, worker=index, health_queue_=health_queue)
+
+
+class Worker:
+    """ A worker process, and what's known of its health. """
+
+    def __init__(self, index: int, shard_ids: list):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.process = None
+        self.restarts = 0
+        self.backoff = 0
+        self.started = 0.0
+        self.died_at = None
+        self.health = None  # The last report, as sent by `report_health_task`.
+        self.last_report = 0.0
+
+    def __repr__(self):
+        return f"worker {self.index} (shards {self.shard_ids})"
+
+
+class Supervisor:
+    def __init__(self, config: dict):
+        shards = config.get("shards", {})
+
+        self.config = config
+        self.shard_count = shards.get("count", 1)
+        shard_ids = shards.get("ids", list(range(self.shard_count)))
+        workers = min(shards.get("workers", 1), len(shard_ids))
+        self.health_timeout = shards.get("health_timeout", 120)
+
+        # (Spawned, not forked, so workers don't share the parent's state.)
+        self.context = multiprocessing.get_context("spawn")
+        self.health_queue = self.context.Queue()
+        self.workers = [Worker(i, shard_ids[i::workers]) for i in range(workers)]
+
+    def process(self, target, args: tuple, name: str):
+        # (Not daemonic, as daemonic processes can't have children, and each
+        # worker's executor has a process pool. They're stopped by `run`.)
+        return self.context.Process(target=target, args=args, name=name, daemon=False)
+
+    def start(self, worker: Worker) -> None:
+        worker.process = self.process(
+            run_worker,
+            (
+                self.config,
+                worker.index,
+                worker.shard_ids,
+                self.shard_count,
+                self.health_queue,
+            ),
+            f"pipebot-worker-{worker.index}",
+        )
+        worker.process.start()
+        worker.started = worker.last_report = time.time()
+        worker.died_at = None
+        worker.health = None
+        print(f"Started {worker}.")
+
+    def stop(self, worker: Worker) -> None:
+        if worker.process is not None and worker.process.is_alive():
+            # (SIGTERM, which the worker handles by closing its client. See
+            # `close_on_sigterm` in `main.py`.)
+            worker.process.terminate()
+            worker.process.join(STOP_TIMEOUT)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+
+    def collect_health(self, timeout: float) -> None:
+        """ Reads every waiting health report, waiting up to `timeout`
+        seconds for the first. """
+        while True:
+            try:
+                report = self.health_queue.get(timeout=timeout)
+            except queue.Empty:
+                return
+            timeout = 0
+
+            worker = self.workers[report["worker"]]
+            worker.health = report
+            worker.last_report = time.time()
+
+    def check(self, worker: Worker) -> None:
+        """ Restarts a worker if it's died or stopped reporting, once its
+        backoff has passed. """
+        now = time.time()
+
+        if worker.died_at is None:
+            if worker.process.is_alive():
+                if now - worker.last_report < self.health_timeout:
+                    return
+                print(f"{worker} hasn't reported in {self.health_timeout}s, stopping it.")
+                self.stop(worker)
+            else:
+                print(f"{worker} exited with code {worker.process.exitcode}.")
+
+            worker.died_at = now
+            if now - worker.started > STABLE_TIME:
+                worker.backoff = 0
+            else:
+                worker.backoff = min(max(worker.backoff * 2, BACKOFF_MIN), BACKOFF_MAX)
+
+        if now - worker.died_at >= worker.backoff:
+            worker.restarts += 1
+            self.start(worker)
+
+    def summary(self) -> str:
+        lines = []
+        guilds = 0
+
+        for worker in self.workers:
+            health = worker.health
+            if worker.died_at is not None:
+                status = f"down, restarting in {worker.backoff}s"
+            elif health is None:
+                status = "starting"
+            else:
+                guilds += health["guilds"]
+                status = (
+                    f"{health['guilds']} guilds, "
+                    f"{health['latency'] * 1000:.0f}ms latency, "
+                    f"{health['timeouts']} timeouts"
+                )
+            lines.append(f"  {worker}: {status}, {worker.restarts} restarts")
+
+        return "\n".join([f"{guilds} guilds across {len(self.workers)} workers:"] + lines)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, exit_on_sigterm)
+        try:
+            for worker in self.workers:
+                self.start(worker)
+
+            last_summary = time.time()
+            while True:
+                self.collect_health(timeout=1)
+                for worker in self.workers:
+                    self.check(worker)
+
+                if time.time() - last_summary > SUMMARY_INTERVAL:
+                    print(self.summary())
+                    last_summary = time.time()
+
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)  # (Already stopping.)
+            for worker in self.workers:
+                self.stop(worker)
+
+
+if __name__ == "__main__":
+    import main
+
+    try:
+        config = main.load_config()
+    except FileNotFoundError:
+        print("No config file found. Run main.py first to make one.")
+    else:
+        Supervisor(config).run()
@@ -1,13 +1,20 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import random
+import timeit
 
 import pytest
 import hypothesis
 import asyncio
 
-from text_transform import process_text
-from main import macro_MESSAGE_pattern, macro_LAST_pattern
+from engine import commands, text_transform
+from engine.text_transform import process_text, process_text_sync
+from engine.macros import macro_MESSAGE_pattern, macro_LAST_pattern
+from admission import Admission
+from message_cache import MessageCache
+from send_queue import SendQueue
+import metrics
+from supervisor import Supervisor
 
 
 # ==============================================================================
@@ -90,6 +97,289 @@ async def test_process_text():
             assert isinstance(processed, str)
 
 
+def test_ast_cache():
+    """ Pipelines are parsed once and shared between messages, and generating
+    text doesn't modify the cached AST. """
+
+    text_transform.ast_cache.clear()
+    hits = text_transform.ast_cache.hits
+
+    first = text_transform.toAST_sync("Hello | caps | redact")
+    second = text_transform.toAST_sync("Goodbye | caps | redact")
+
+    assert text_transform.ast_cache.hits == hits + 1
+    assert first.commands is second.commands
+    assert second.content == ("Goodbye ",)
+
+    for _ in range(2):
+        assert text_transform.generate_sync(second) == "███████"
+    assert second == text_transform.parse("Goodbye | caps | redact")
+
+
+def test_command_fusion():
+    """ Runs of per-character commands give the same text fused as they do
+    run one after the other. """
+
+    chains = [("caps", "vaporwave"), ("lower", "serif", "flip"), ("swapcase", "leet", "redact")]
+    texts = ["Hello, World!", "Straße İstanbul", "ΣΑΣ ΟΔΟΣ", ""]
+
+    for chain in chains:
+        group_commands = tuple(text_transform.Command(alias, ()) for alias in chain)
+        for text in texts:
+            expected = text
+            for alias in chain:
+                expected = commands.get_callback(commands.alias_map[alias])(expected, ())
+
+            generated = text_transform.generate_sync(
+                text_transform.Group((text,), group_commands)
+            )
+            assert generated == expected
+
+
+def test_compiled_programs():
+    """ Cached programs give the same text as their ASTs, with any literal
+    text put in front. """
+
+    for text in ["{a | caps} b {c {d | bold} | clap}", "Hello | caps | bold", "x {} | caps"]:
+        for head in ["", "Some text "]:
+            AST, program = text_transform.toProgram_sync(head + text)
+            assert text_transform.run_program(program) == text_transform.generate_sync(AST)
+    assert text_transform.compile_group(text_transform.toAST_sync("{a {b}} c")).body == (
+        (text_transform.PUSH, "a "),
+        (text_transform.PUSH, "b"),
+        (text_transform.JOIN, 2),
+        (text_transform.PUSH, " c"),
+    )
+
+def test_deep_nesting():
+    """ Nesting is only limited by `MAX_DEPTH`, not by recursion. """
+
+    depth = text_transform.MAX_DEPTH
+    assert depth >= 10_000
+    assert process_text_sync("{" * depth + "Hello" + " | caps}" * depth) == "HELLO"
+    assert process_text_sync("{" * depth + "a" + "}" * depth + " | bold") == "**a**"
+    assert process_text_sync("{" * depth + "a" + "}" * (depth - 1)) == "`ERROR: Unbalanced curly braces.`"
+    assert process_text_sync("{" * (depth + 1) + "a" + "}" * (depth + 1)).startswith(
+        "`ERROR: Groups nested too deeply."
+    )
+
+    AST = text_transform.toAST_sync("{" * depth + "x | clap" + "}" * depth)
+    assert text_transform.estimate_length(AST) == 1
+    assert text_transform.pipeline_cost(AST) == "light"
+    assert text_transform.generate_sync(AST) == "x"
+
+def test_seeded_random():
+    """ Random commands are reproducible with a seed, without touching the
+    global random state. """
+
+    text = "{Hello, world! | mock} {Hello, world! | zalgo} | scramble | faux_cyrillic"
+    state = random.getstate()
+    result = process_text_sync(text, seed=1234)
+    assert random.getstate() == state
+
+    text_transform.result_cache.clear()
+    assert process_text_sync(text, seed=1234) == result
+    assert process_text_sync(text, seed=4321) != result
+
+def test_bytes_values():
+    """ Bytes pass between commands as they are, so they needn't be UTF-8
+    until they're turned back into text. """
+
+    assert process_text_sync("héllo | hex | from_hex | base64 | from_base64") == "héllo"
+    assert process_text_sync("héllo | hex | from_hex | sha256") == process_text_sync("héllo | sha256")
+    assert process_text_sync("ff fe | from_hex | hex") == "ff fe"
+    assert process_text_sync("abc | hex é") == "61é62é63"
+    assert process_text_sync("abc | hex 👏") == "61👏62👏63"
+    assert process_text_sync("/w== | from_base64 | bin") == "11111111"
+    assert process_text_sync("ff | from_hex") == "`ERROR: Result isn't valid UTF-8 text.`"
+    assert process_text_sync("{ff | from_hex} | hex") == "`ERROR: Result isn't valid UTF-8 text.`"
+
+def test_size_estimate():
+    """ Chains certain to outgrow the buffer, or the response length, are
+    stopped before they're generated. Estimates are lower bounds, so nothing
+    that would fit is turned away. """
+
+    assert process_text_sync("a" * 4000 + " | hex | md5").startswith("`ERROR: Text result would")
+    assert process_text_sync("a" * 4000 + " | binary | md5") == "`ERROR: Text result much too long for buffer.`"
+    assert process_text_sync("a" * 1500 + " | caps", max_length=1000).startswith("`ERROR: Result would")
+    assert process_text_sync("a" * 1500 + " | caps | md5", max_length=1000) == process_text_sync(
+        "a" * 1500 + " | upper | md5"
+    )
+    assert len(process_text_sync("a" * 1800 + " | clap", max_length=2000)) == 1800
+    assert len(process_text_sync("e" * 600 + " | morse", max_length=2000)) == 1200
+    assert len(process_text_sync("e" * 2600 + " | morse | md5")) == 32
+
+    # (Commands that can blow up check their text before they're run.)
+    too_long = "`ERROR: Text result much too long for buffer.`"
+    assert process_text_sync("a " * 1000 + "| clap " + "z" * 1900) == too_long
+    assert process_text_sync("{" + "e" * 6000 + "} | morse") == too_long
+    assert text_transform.estimate_length(text_transform.toAST_sync("{ a | blockquote} | bold")) == 6
+
+
+
+def test_time_budget():
+    """ Requests over their budget are cancelled, and counted. """
+
+    timeouts = text_transform.timeouts
+    text = "{" * 200 + "Hello" + " | clap}" * 200
+    assert process_text_sync(text, time_budget=0) == "`ERROR: Took too long to process, and was cancelled.`"
+    assert text_transform.timeouts == timeouts + 1
+    assert process_text_sync("Hello | caps", time_budget=10) == "HELLO"
+
+
+def test_message_cache():
+    from types import SimpleNamespace
+
+    def message(id_, author_id, channel_id=1):
+        return SimpleNamespace(
+            id=id_,
+            author=SimpleNamespace(id=author_id),
+            channel=SimpleNamespace(id=channel_id),
+        )
+
+    cache = MessageCache(max_messages=3)
+    for id_, author_id in [(10, 100), (11, 101), (12, 100), (13, 101)]:
+        cache.add(message(id_, author_id))
+
+    assert len(cache) == 3
+    assert cache.get(1, 10) is None  # (Evicted.)
+    assert cache.get(1, 11).author.id == 101
+    assert cache.last_by(1, 101, before_id=13).id == 11
+    assert cache.last_by(1, 100, before_id=13).id == 12
+    assert cache.before(1, 13).id == 12
+    assert cache.before(2, 13) is None
+
+    cache.remove(1, 12)
+    assert cache.last_by(1, 100, before_id=13) is None
+    assert cache.before(1, 13).id == 11
+    assert (cache.hits, cache.misses) == (5, 3)
+
+    # (Edits are made to messages in place. Looking them up isn't counted.)
+    assert cache.peek(1, 11).id == 11
+    assert cache.peek(1, 12) is None
+    assert (cache.hits, cache.misses) == (5, 3)
+
+
+@pytest.mark.asyncio
+async def test_send_queue():
+    from types import SimpleNamespace
+
+    sent = []
+
+    async def send(content, embed=None):
+        sent.append(content)
+
+    channel = SimpleNamespace(id=1, send=send)
+    queue = SendQueue(channel_limit=1, channel_period=0.05)
+
+    replies = [queue.reserve(channel) for _ in range(5)]
+    # (Filled in out of order, with one given up.)
+    replies[1].send("b")
+    replies[0].send("a")
+    replies[2].cancel()
+    replies[4].send("`INFO: Error.`")
+    replies[3].send("`INFO: Error.`")
+
+    while len(queue):
+        await asyncio.sleep(0.01)
+
+    assert sent == ["a", "b", "`INFO: Error.` (x2)"]
+    assert (queue.sends, queue.coalesced, queue.max_queued) == (4, 1, 5)
+
+
+def test_admission():
+    admission = Admission(
+        user={"capacity": 100, "rate": 10},
+        channel={"capacity": 1000, "rate": 1000},
+        max_delay=1,
+    )
+
+    assert admission.cost(12, "light") == 12
+    assert admission.cost(13, "heavy") == 13 * 10
+
+    assert admission.admit(100, user=1, channel=1) == 0
+    assert 0 < admission.admit(5, user=1, channel=1) <= 1  # (Delayed.)
+    assert admission.admit(100, user=1, channel=1) is None  # (Rejected.)
+    assert admission.notify(1)
+    assert not admission.notify(1)
+    assert admission.admit(100, user=2, channel=1) == 0  # (Someone else.)
+    assert (admission.admitted, admission.delayed, admission.rejected) == (3, 1, 1)
+
+    # (Buckets are dropped once they'd be full again.)
+    for scope in admission.scopes.values():
+        scope.evict(float("inf"))
+    assert len(admission) == 0
+
+
+def test_metrics():
+    histogram = metrics.Metric("test_seconds", "Test.", "histogram", ("stage",), (0.1, 1))
+    series = histogram.labels("parse")
+    assert histogram.labels("parse") is series
+    for value in [0.05, 0.1, 0.5, 5]:
+        series.observe(value)
+
+    assert list(histogram.render()) == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="parse",le="0.1"} 2',
+        'test_seconds_bucket{stage="parse",le="1"} 3',
+        'test_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'test_seconds_sum{stage="parse"} 5.65',
+        'test_seconds_count{stage="parse"} 4',
+    ]
+
+    metrics.count_error("`ERROR: Groups nested too deeply. (Max depth is 5.)`")
+    metrics.count_error("`ERROR: \n1, 5: Expected COMMAND, got PIPE`")
+    assert metrics.errors.labels("Groups nested too deeply").value == 1
+    assert metrics.errors.labels("Expected COMMAND, got PIPE").value == 1
+
+    # (Details like lengths don't make new series.)
+    for length in range(2001, 3501):
+        metrics.count_error(f"`ERROR: Result would be too long. {length}+/2000`")
+    assert metrics.errors.labels("Result would be too long").value == 1500
+    assert len(metrics.errors.series) <= metrics.MAX_ERROR_KINDS
+
+    before = metrics.command_series["caps"].value
+    metrics.count_commands(text_transform.toAST_sync("a {b | caps} | upper"))
+    assert metrics.command_series["caps"].value == before + 2
+
+
+def test_supervisor_worker_pools():
+    """ Workers run an `Executor`, whose process pool is made of the worker's
+    own child processes. """
+    code = (
+        "import asyncio\n"
+        "from executor import Executor\n"
+        "executor = Executor(process_workers=1, inline_max_length=10)\n"
+        "asyncio.run(executor.process_text('hello world long text | zalgo'))\n"
+        "executor.shutdown()\n"
+    )
+    process = Supervisor({}).process(exec, (code,), "test-worker")
+    process.start()
+    try:
+        process.join(60)
+        assert process.exitcode == 0
+    finally:
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+
+@pytest.mark.parametrize("callback", ["redact", "mock", "anagram", "zalgo"])
+def test_callback_linear_time(callback):
+    """ Ten times the text should take about ten times as long, not the
+    hundred times a quadratic callback would. """
+
+    callback = getattr(commands.command_funcs(), callback)
+
+    def best_time(size):
+        text = ("HelloWorld" * size)[:size]  # (One long word, for anagram.)
+        return min(timeit.repeat(lambda: callback(text, ()), number=1, repeat=3))
+
+    times = [best_time(size) for size in [1_000, 10_000, 100_000]]
+    assert times[1] < 30 * times[0]
+    assert times[2] < 30 * times[1]
+
 # Hypothesis ===================================================================
 @hypothesis.given(hypothesis.strategies.text())
 @hypothesis.settings(max_examples=1500, deadline=1000)
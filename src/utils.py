@@ -3,11 +3,8 @@
 # A collection of utilities related to the program, but that don't need to be
 # included in its source code directly.
 
-import asyncio
-
 from colorama import Fore, Back, Style
-import commands
-import text_transform
+from engine import commands, text_transform
 
 
 def t_print(tokens, show_key=False) -> None:
@@ -64,7 +61,7 @@ def generate_html_command_table():
             esc_description = html_escape(description)
 
             try:
-                esc_example = html_escape(asyncio.run(text_transform.process_text(f"{description}|{alias}")))
+                esc_example = html_escape(text_transform.process_text_sync(f"{description}|{alias}"))
             except:
                 esc_example = "N/A"
 